@@ -0,0 +1,128 @@
+import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPACITY = 64
+FLOAT_KIND = "f"
+DATE_KIND = "M"
+OBJECT_KIND = "O"
+DTYPES = {FLOAT_KIND: np.float64, DATE_KIND: "datetime64[ns]", OBJECT_KIND: object}
+MISSING = {FLOAT_KIND: np.nan, DATE_KIND: np.datetime64("NaT"), OBJECT_KIND: None}
+
+
+_kinds_by_type = {type(None): None, float: FLOAT_KIND, int: FLOAT_KIND, str: OBJECT_KIND, bool: OBJECT_KIND}
+
+
+def kind_of(value) -> Optional[str]:
+    """
+    the column kind value fits, None when it fits any (a missing value)
+    """
+    value_type = type(value)
+    try:
+        return _kinds_by_type[value_type]
+    except KeyError:
+        pass
+    if isinstance(value, (bool, np.bool_)):
+        kind = OBJECT_KIND
+    elif isinstance(value, (int, float, np.integer, np.floating)):
+        kind = FLOAT_KIND
+    elif isinstance(value, (datetime.date, np.datetime64)):
+        kind = DATE_KIND
+    else:
+        kind = OBJECT_KIND
+    _kinds_by_type[value_type] = kind
+    return kind
+
+
+class Column(object):
+    """
+    a typed, growable numpy buffer: capacity doubles when full, so appends are amortized O(1)
+    """
+
+    def __init__(self, kind: str, num_missing: int = 0):
+        self.kind = kind
+        self.size = 0
+        self.values = np.empty(max(INITIAL_CAPACITY, num_missing), dtype=DTYPES[kind])
+        for _ in range(num_missing):
+            self.append(None)
+
+    def append(self, value):
+        if self.size == len(self.values):
+            self.values = np.resize(self.values, 2 * len(self.values))
+        self.values[self.size] = MISSING[self.kind] if value is None else self.convert(value)
+        self.size += 1
+
+    def convert(self, value):
+        if self.kind == DATE_KIND:
+            return np.datetime64(value, "ns")
+        return value
+
+    def promote(self):
+        """
+        turns the column into an object column, for a value its kind cannot hold
+        """
+        values = np.empty(len(self.values), dtype=object)
+        values[:self.size] = [None if pd.isna(value) else value for value in self.view()]
+        if self.kind == DATE_KIND:
+            values[:self.size] = [None if value is None else pd.Timestamp(value) for value in values[:self.size]]
+        self.values = values
+        self.kind = OBJECT_KIND
+
+    def view(self) -> np.ndarray:
+        return self.values[:self.size]
+
+
+class ColumnAccumulator(object):
+    """
+    rows of {column: value or [value]} merged into typed columns (floats, dates, anything else as objects).
+    columns keep the order they were first seen in; a row missing a column gets NaN / NaT / None there
+    """
+
+    def __init__(self):
+        self.columns = dict()
+        self.num_rows = 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def append(self, row: dict):
+        num_rows = self.num_rows
+        for name, value in row.items():
+            if isinstance(value, (list, tuple, np.ndarray, pd.Series)):
+                for item in value:
+                    self.append_value(name, item)
+            else:
+                self.append_value(name, value)
+        self.num_rows = max((column.size for column in self.columns.values()), default=num_rows)
+        for column in self.columns.values():
+            while column.size < self.num_rows:
+                column.append(None)
+
+    def append_value(self, name, value):
+        kind = kind_of(value)
+        column = self.columns.get(name)
+        if column is not None and (kind == column.kind or kind is None):
+            column.append(value)
+            return
+        if column is None:
+            if kind is None:
+                kind = FLOAT_KIND
+            column = self.columns[name] = Column(kind, num_missing=self.num_rows)
+        elif kind is not None and kind != column.kind:
+            if column.kind == FLOAT_KIND and column.size == self.num_rows_missing(column):
+                column = self.columns[name] = Column(kind, num_missing=column.size)
+            elif column.kind != OBJECT_KIND:
+                column.promote()
+        column.append(value)
+
+    @staticmethod
+    def num_rows_missing(column) -> int:
+        return int(np.isnan(column.view()).sum()) if column.kind == FLOAT_KIND else 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        the columns as a DataFrame over the accumulated buffers, without copying them
+        """
+        return pd.DataFrame({name: column.view() for name, column in self.columns.items()}, copy=False)
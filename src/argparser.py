@@ -1,6 +1,13 @@
 import argparse
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 def create_parser(config, description):
     parser = argparse.ArgumentParser(description=description)
     for name, config in config.items():
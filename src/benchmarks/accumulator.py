@@ -0,0 +1,78 @@
+"""
+merges synthetic per-ticker report rows the way ManyTickerReport.resolve_futures does: the old
+np.append per column per row against ColumnAccumulator, reporting merge time and peak memory (tracemalloc).
+
+usage (from src/, with the same env vars as earnings.py):
+    python -m benchmarks.accumulator --tickers 5000
+"""
+import argparse
+import datetime
+import random
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from accumulator import ColumnAccumulator
+
+STATISTIC_TITLES = ["close %", "n day mean m %", "n day median m %", "straddle predicted movement %",
+                    "profit_probability %"]
+
+
+def synthetic_rows(num_tickers, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(num_tickers):
+        row = {title: [None if rng.random() < 0.05 else rng.uniform(0, 100)] for title in STATISTIC_TITLES}
+        row["ticker"] = [f"T{i:05d}"]
+        row["earning date"] = datetime.date(2026, 10, 18) + datetime.timedelta(days=rng.randint(0, 30))
+        rows.append(row)
+    return rows
+
+
+def merge_np_append(rows):
+    data = dict()
+    for res in rows:
+        for k, v in res.items():
+            stats = data.get(k, [])
+            data[k] = np.append(stats, v)
+    return pd.DataFrame.from_dict(data)
+
+
+def merge_accumulator(rows):
+    data = ColumnAccumulator()
+    for res in rows:
+        data.append(res)
+    return data.to_frame()
+
+
+def measure(fn, rows):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = fn(rows)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="resolve_futures merge benchmark")
+    parser.add_argument("--tickers", type=int, default=5000, dest="tickers")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.tickers)
+    old, old_elapsed, old_peak = measure(merge_np_append, rows)
+    new, new_elapsed, new_peak = measure(merge_accumulator, rows)
+
+    same = old["ticker"].tolist() == new["ticker"].tolist() and all(
+        np.allclose(old[title].astype(float), new[title], equal_nan=True) for title in STATISTIC_TITLES)
+    print(f"tickers:     {args.tickers}")
+    print(f"np.append:   {old_elapsed:.3f}s, peak {old_peak / 2 ** 20:.1f} MiB, dtypes {dict(old.dtypes.astype(str).value_counts())}")
+    print(f"accumulator: {new_elapsed:.3f}s, peak {new_peak / 2 ** 20:.1f} MiB, dtypes {dict(new.dtypes.astype(str).value_counts())}")
+    print(f"speedup:     {old_elapsed / new_elapsed:.1f}x, same values: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+drives the adaptive TokenBucket against a local stub server that allows --server-rate requests / s
+and answers everything above that with a 429, then reports the throughput the limiter settled on.
+
+usage (from src/, with the same env vars as earnings.py):
+    python -m benchmarks.limiter --server-rate 20 --requests 400 --threads 8
+"""
+import argparse
+import concurrent.futures
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from clients.limiter import TokenBucket, mount_limiter
+
+
+class StubServer(ThreadingHTTPServer):
+    def __init__(self, rate, retry_after=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.rate = rate
+        self.retry_after = retry_after
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.num_ok = 0
+        self.num_throttled = 0
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.num_ok += 1
+                return True
+            self.num_throttled += 1
+            return False
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.server.allow():
+            self.send_response(200)
+        else:
+            self.send_response(429)
+            if self.server.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.retry_after))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="adaptive token bucket vs a throttling stub server")
+    parser.add_argument("--server-rate", type=float, default=20.0, dest="server_rate")
+    parser.add_argument("--retry-after", type=float, default=None, dest="retry_after")
+    parser.add_argument("--requests", type=int, default=400, dest="requests")
+    parser.add_argument("--threads", type=int, default=8, dest="threads")
+    parser.add_argument("--start-rate", type=float, default=1.0, dest="start_rate")
+    args = parser.parse_args()
+
+    server = StubServer(args.server_rate, args.retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    limiter = TokenBucket(rate=args.start_rate, min_rate=0.2, max_rate=args.server_rate * 4,
+                          name="benchmark.limiter")
+    session = requests.Session()
+    mount_limiter(session, "http://", limiter)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
+        statuses = list(executor.map(lambda _: session.get(url).status_code, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"requests:        {args.requests} in {elapsed:.2f}s ({args.requests / elapsed:.1f}/s, server allows {args.server_rate:g}/s)")
+    print(f"server 429s:     {server.num_throttled}")
+    print(f"failed requests: {sum(status != 200 for status in statuses)}")
+    print(f"limiter:         {limiter.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+compares loading every data/<ticker>/earnings.csv with pd.read_csv against slicing it out of the earnings store.
+
+usage (from src/, with the same env vars as earnings.py):
+    python -m benchmarks.loader --data-dir ../data
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from store import EarningsStore
+
+
+def load_csv(csv_files):
+    return [pd.read_csv(csv_file) for csv_file in csv_files]
+
+
+def load_store(store, csv_files):
+    return [store.read_csv_slice(csv_file) for csv_file in csv_files]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    res = fn(*args)
+    return res, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="earnings.csv vs earnings store loader benchmark")
+    parser.add_argument("--data-dir", required=True, dest="data_dir")
+    args = parser.parse_args()
+
+    store = EarningsStore(args.data_dir)
+    if not store.exists():
+        _, elapsed = timed(store.convert)
+        print(f"built store in {elapsed:.2f}s")
+
+    tickers_to_files = {
+        ticker: csv_file for ticker, csv_file in store.list_csv_files().items()
+        if store.is_earnings_csv(csv_file)
+    }
+    csv_files = list(tickers_to_files.values())
+
+    from_csv, csv_elapsed = timed(load_csv, csv_files)
+    from_store, store_elapsed = timed(load_store, store, csv_files)
+
+    mismatches = 0
+    for csv_df, store_df in zip(from_csv, from_store):
+        if store_df is None or len(csv_df) != len(store_df) or \
+                not csv_df["Max Move"].astype(float).reset_index(drop=True).equals(store_df["Max Move"]):
+            mismatches += 1
+
+    print(f"tickers: {len(csv_files)}")
+    print(f"pd.read_csv: {csv_elapsed:.3f}s")
+    print(f"store:       {store_elapsed:.3f}s ({csv_elapsed / store_elapsed:.1f}x)")
+    print(f"mismatches:  {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+compares the per-window pandas loop that MaxMeanMovement / MaxMedianMovement used to run
+against strategies.rolling, per ticker and batched over the whole data/ tree.
+
+usage (from src/, with the same env vars as earnings.py):
+    python -m benchmarks.rolling --data-dir ../data --days 30
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from store import EarningsStore
+from strategies.rolling import rolling_means, rolling_medians, \
+    batch_rolling_means, batch_rolling_medians, num_days_to_calculate
+
+
+def load_max_moves(data_dir):
+    store = EarningsStore(data_dir)
+    max_moves = []
+    for csv_file in store.list_csv_files().values():
+        if not store.is_earnings_csv(csv_file):
+            continue
+        df = pd.read_csv(csv_file)
+        df["Earning Date"] = pd.to_datetime(df["Earning Date"])
+        df.sort_values(by="Earning Date", ascending=False, inplace=True)
+        max_moves.append(df["Max Move"].reset_index(drop=True))
+    return max_moves
+
+
+def loop(max_move, days, reduce):
+    res = []
+    days_to_calculate = num_days_to_calculate(len(max_move), days)
+    for i in range(0, days_to_calculate):
+        window = max_move.iloc[i:days_to_calculate + i].abs()
+        res.append(getattr(window, reduce)())
+    return np.array(res, dtype=float)
+
+
+def engine(max_move, days, fn):
+    return fn(max_move.abs().to_numpy(dtype=float), num_days_to_calculate(len(max_move), days))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    res = fn(*args)
+    return res, time.perf_counter() - start
+
+
+def compare(name, expected, actual):
+    mismatches = sum(
+        not np.allclose(e, a, equal_nan=True) for e, a in zip(expected, actual)
+    )
+    print(f"{name} mismatches: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rolling max mean / max median benchmark")
+    parser.add_argument("--data-dir", required=True, dest="data_dir")
+    parser.add_argument("--days", type=int, default=30, dest="days")
+    args = parser.parse_args()
+
+    max_moves = load_max_moves(args.data_dir)
+    arrays = [max_move.abs().to_numpy(dtype=float) for max_move in max_moves]
+    print(f"tickers: {len(max_moves)}, rows: {sum(len(m) for m in max_moves)}")
+
+    for reduce, fn, batch_fn in [("mean", rolling_means, batch_rolling_means),
+                                 ("median", rolling_medians, batch_rolling_medians)]:
+        expected, loop_elapsed = timed(lambda: [loop(m, args.days, reduce) for m in max_moves])
+        actual, engine_elapsed = timed(lambda: [engine(m, args.days, fn) for m in max_moves])
+        batched, batch_elapsed = timed(batch_fn, arrays, args.days)
+        print(f"{reduce}: loop {loop_elapsed:.3f}s | "
+              f"engine {engine_elapsed:.3f}s ({loop_elapsed / engine_elapsed:.1f}x) | "
+              f"batched {batch_elapsed:.3f}s ({loop_elapsed / batch_elapsed:.1f}x)")
+        compare(f"{reduce} engine", expected, actual)
+        compare(f"{reduce} batched", expected, batched)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+cold start of the cli: wall time of `python earnings.py --help` and, per command, of importing earnings.py
+plus that command's module, checked against the command's budget in earnings.COMMANDS.
+
+usage (from src/, with the same env vars as earnings.py):
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from earnings import COMMANDS
+
+LOAD_COMMAND = "import earnings; earnings.COMMANDS[{mode!r}].load()"
+
+
+def wall_time(cmd, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cli cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5, dest="runs")
+    args = parser.parse_args()
+
+    help_seconds = wall_time([sys.executable, "earnings.py", "--help"], args.runs)
+    print(f"earnings.py --help: {help_seconds * 1000:.0f} ms (median of {args.runs})")
+
+    over_budget = 0
+    for mode, command in COMMANDS.items():
+        seconds = wall_time([sys.executable, "-c", LOAD_COMMAND.format(mode=mode)], args.runs)
+        verdict = "ok" if seconds * 1000 <= command.budget_ms else "OVER"
+        over_budget += verdict != "ok"
+        print(f"{mode:<18} {seconds * 1000:>6.0f} ms  budget {command.budget_ms:>5} ms  {verdict}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+# 256 MB
+DEFAULT_FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+class FrameCache(LoggingMixin):
+    """
+    process-wide LRU cache of parsed earnings frames keyed by (path, mtime, size).
+    every caller gets a shallow copy: adding or replacing columns never touches the cached frame, but the column
+    data is shared, so writing into an existing column in place would change it for every caller.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_FRAME_CACHE_MAX_BYTES, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.frames = OrderedDict()
+        self.paths = dict()
+        self.lock = threading.Lock()
+        self.loading = dict()
+
+    @staticmethod
+    def key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def view(self, path, loader) -> pd.DataFrame:
+        """
+        loader(path) -> DataFrame is only called on a miss, and only once per key across threads
+        """
+        try:
+            key = self.key(path)
+        except FileNotFoundError:
+            return loader(path)
+
+        df = self.get(key)
+        if df is not None:
+            with self.lock:
+                self.hits += 1
+            return df.copy(deep=False)
+
+        with self.lock:
+            key_lock = self.loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # a thread that waited for another thread's load finds the frame cached: that is a hit
+            df = self.get(key)
+            is_hit = df is not None
+            if df is None:
+                df = loader(path)
+                self.put(key, df)
+        with self.lock:
+            if is_hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.loading.pop(key, None)
+        return df.copy(deep=False)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.frames.get(key)
+            if entry is None:
+                return None
+            self.frames.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, df):
+        num_bytes = int(df.memory_usage(index=True, deep=True).sum())
+        with self.lock:
+            if key in self.frames:
+                return
+            stale = self.paths.get(key[0])
+            if stale is not None:
+                self.evict(stale)
+            self.frames[key] = (df, num_bytes)
+            self.paths[key[0]] = key
+            self.num_bytes += num_bytes
+            while self.num_bytes > self.max_bytes and len(self.frames) > 1:
+                self.evict(next(iter(self.frames)))
+
+    def evict(self, key):
+        _, num_bytes = self.frames.pop(key)
+        self.paths.pop(key[0], None)
+        self.num_bytes -= num_bytes
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.paths.clear()
+            self.num_bytes = 0
+
+
+frame_cache = FrameCache()
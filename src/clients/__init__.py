@@ -1,2 +1,27 @@
-from .robinhood import *
-from .yfinance import *
\ No newline at end of file
+import importlib
+
+# public name -> submodule defining it. submodules are imported on first use, so e.g. the journal
+# command does not pay for yfinance / investpy and the store commands pay for no client library at all
+_LAZY_NAMES = {
+    "ValidationClient": ".client",
+    "OptionsClient": ".client",
+    "StraddleQuote": ".client",
+    "Client": ".client",
+    "RobinhoodBase": ".robinhood",
+    "RobinhoodValidation": ".robinhood",
+    "Robinhood": ".robinhood",
+    "YFinance": ".yfinance",
+    "YFinanceValidation": ".yfinance",
+    "IndexedOptionChain": ".yfinance",
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -27,16 +27,48 @@ class ValidationClient(metaclass=MethodLoggerMeta):
         raise NotImplemented
 
 
+class StraddleQuote(object):
+    """
+    the inputs and result of one straddle implied move calculation
+    """
+
+    def __init__(self, expiration_date, latest_price, strike, straddle_price, straddle_predicted_movement):
+        self.expiration_date = expiration_date
+        self.latest_price = latest_price
+        self.strike = strike
+        self.straddle_price = straddle_price
+        self.straddle_predicted_movement = straddle_predicted_movement
+
+    def __repr__(self):
+        return f"StraddleQuote(expiration_date={self.expiration_date}, latest_price={self.latest_price}, " \
+               f"strike={self.strike}, straddle_price={self.straddle_price}, " \
+               f"straddle_predicted_movement={self.straddle_predicted_movement})"
+
+    def as_dict(self):
+        return {
+            "expiration": self.expiration_date,
+            "spot": self.latest_price,
+            "strike": self.strike,
+            "straddle price": self.straddle_price,
+        }
+
+
 class OptionsClient(metaclass=MethodLoggerMeta):
     def __subclasshook__(cls, subclass):
         return (
                 hasattr(subclass, 'get_straddle_predicted_movement') and
-                callable(subclass.get_straddle_predicted_movement)
+                callable(subclass.get_straddle_predicted_movement) and
+                hasattr(subclass, 'get_straddle_quote') and
+                callable(subclass.get_straddle_quote)
         )
 
     @abc.abstractmethod
     def get_straddle_predicted_movement(self, symbol: Optional[str]) -> float:
         raise NotImplemented
 
+    @abc.abstractmethod
+    def get_straddle_quote(self, symbol: Optional[str], latest_price: Optional[float] = None) -> Optional[StraddleQuote]:
+        raise NotImplemented
+
 
 Client = Union[ValidationClient, OptionsClient]
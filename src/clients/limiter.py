@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+
+# responses that mean "slow down"
+THROTTLE_STATUS_CODES = (429, 503)
+UNAUTHORIZED_STATUS_CODE = 401
+# like tcp congestion control: the rate grows by SLOW_START_FACTOR per success until the first throttle,
+# is multiplied by BACKOFF_FACTOR on every throttle and afterwards grows by RAMP_UP_STEP requests / s per success
+SLOW_START_FACTOR = 1.1
+BACKOFF_FACTOR = 0.5
+RAMP_UP_STEP = 0.1
+# a throttled request is retried at most this many times before its response is returned as is
+MAX_THROTTLE_RETRIES = 3
+
+
+class TokenBucket(object):
+    """
+    thread-safe token bucket whose rate adapts to the server: it backs off (down to min_rate) whenever
+    the server throttles us and ramps up (to max_rate) while requests go through.
+    a Retry-After pauses every caller until it has passed.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, capacity=1, name="limiter"):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity
+        self.name = name
+        self.tokens = capacity
+        self.slow_start_threshold = max_rate
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.num_succeeded = 0
+        self.num_throttled = 0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> float:
+        """
+        blocks until a token is available, returns the seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        metrics.observe(f"{self.name}.wait_seconds", waited)
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def throttled(self, retry_after: Optional[float] = None):
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+            self.slow_start_threshold = self.rate
+            self.tokens = 0
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.paused_until = max(self.paused_until, now + pause)
+            self.num_throttled += 1
+        metrics.increment(f"{self.name}.throttled")
+
+    def succeeded(self):
+        with self.lock:
+            if self.rate < self.slow_start_threshold:
+                self.rate = min(self.slow_start_threshold, self.rate * SLOW_START_FACTOR)
+            else:
+                self.rate = min(self.max_rate, self.rate + RAMP_UP_STEP)
+            self.num_succeeded += 1
+
+    def throughput(self) -> float:
+        """
+        successful requests per second since the bucket was created
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.started_at
+            return self.num_succeeded / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        return {"rate": round(self.rate, 3), "succeeded": self.num_succeeded,
+                "throttled": self.num_throttled, "throughput": round(self.throughput(), 3)}
+
+
+def parse_retry_after(response) -> Optional[float]:
+    try:
+        return max(float(response.headers["Retry-After"]), 0.0)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    takes a token from limiter before every request and feeds the response's status back into it,
+    retrying throttled requests up to MAX_THROTTLE_RETRIES times.
+    on_unauthorized(request) may return a fresh Authorization header for a 401, the request is then sent once more
+    """
+
+    def __init__(self, limiter: TokenBucket, on_unauthorized=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+        self.on_unauthorized = on_unauthorized
+
+    def send(self, request, *args, **kwargs):
+        response = self.send_limited(request, *args, **kwargs)
+        if response.status_code == UNAUTHORIZED_STATUS_CODE and self.on_unauthorized is not None:
+            authorization = self.on_unauthorized(request)
+            if authorization is not None:
+                response.close()
+                request.headers["Authorization"] = authorization
+                response = self.send_limited(request, *args, **kwargs)
+        return response
+
+    def send_limited(self, request, *args, **kwargs):
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            self.limiter.acquire()
+            response = super().send(request, *args, **kwargs)
+            if response.status_code not in THROTTLE_STATUS_CODES:
+                self.limiter.succeeded()
+                return response
+            self.limiter.throttled(parse_retry_after(response))
+            if attempt < MAX_THROTTLE_RETRIES:
+                response.close()
+        return response
+
+
+def mount_limiter(session, prefix, limiter: TokenBucket, on_unauthorized=None):
+    adapter = session.get_adapter(prefix)
+    if isinstance(adapter, RateLimitedAdapter) and adapter.limiter is limiter:
+        return
+    session.mount(prefix, RateLimitedAdapter(limiter, on_unauthorized))
@@ -1,12 +1,15 @@
+import threading
 from enum import Enum
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-from . import ValidationClient, OptionsClient
-from .robinhood import Robinhood
+from .client import ValidationClient, OptionsClient
 from .yfinance import YFinance, YFinanceValidation
 from .client import Client
 from log.metaclass import MethodLoggerMeta
 
+if TYPE_CHECKING:
+    from .robinhood import Robinhood
+
 
 class Clients(Enum):
     y_finance = 0
@@ -30,16 +33,52 @@ class ClientFactory(object, metaclass=MethodLoggerMeta):
             return YFinanceValidation()
         if client_type == Clients.y_finance_validation:
             return YFinanceValidation()
-        if client_type == Clients.robinhood.name:
-            return Robinhood(username=self.username,
-                             password=self.password,
-                             mfa_code=self.mfa_code)
-        if client_type == Clients.robinhood:
+        if client_type in (Clients.robinhood, Clients.robinhood.name):
+            # robin_stocks is slow to import and only the robinhood commands need it
+            from .robinhood import Robinhood
             return Robinhood(username=self.username,
                              password=self.password,
                              mfa_code=self.mfa_code)
 
 
+class ClientPool(object):
+    """
+    at most max_size live clients of one client_type, one per ticker.
+    acquire blocks while the pool is full; release drops the ticker's client once nobody holds it.
+    """
+
+    def __init__(self, factory: ClientFactory, client_type: Clients, max_size: int):
+        self.factory = factory
+        self.client_type = client_type
+        self.max_size = max_size
+        self.clients = dict()
+        self.holders = dict()
+        self.condition = threading.Condition()
+
+    def acquire(self, ticker: str) -> Client:
+        with self.condition:
+            while ticker not in self.clients and len(self.clients) >= self.max_size:
+                self.condition.wait()
+            client = self.clients.get(ticker)
+            if client is None:
+                client = self.factory.create(client_type=self.client_type, ticker=ticker)
+                self.clients[ticker] = client
+            self.holders[ticker] = self.holders.get(ticker, 0) + 1
+            return client
+
+    def release(self, ticker: str):
+        with self.condition:
+            self.holders[ticker] -= 1
+            if self.holders[ticker] == 0:
+                del self.holders[ticker]
+                del self.clients[ticker]
+                self.condition.notify()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.clients)
+
+
 def create_client(client_type: Clients,
                   ticker: Optional[str] = None,
                   username: Optional[str] = None,
@@ -49,7 +88,7 @@ def create_client(client_type: Clients,
     return factory.create(client_type=client_type, ticker=ticker)
 
 
-def create_rh_client(username: str, password: str, mfa_code: str) -> Robinhood:
+def create_rh_client(username: str, password: str, mfa_code: str) -> "Robinhood":
     return create_client(
         username=username,
         password=password,
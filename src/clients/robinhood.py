@@ -1,30 +1,86 @@
+import bisect
 import logging
-import random
+import threading
 import weakref
 import inspect
-from time import sleep
+from collections import defaultdict
 from datetime import date, datetime
-from threading import Semaphore
 
-import investpy
-import yfinance as yf
 import robin_stocks.robinhood as rh
-from wrapt_timeout_decorator import *
-
-from clients.yfinance import YFinance
-from clients.client import ValidationClient, OptionsClient
+from robin_stocks.robinhood.globals import SESSION
+from robin_stocks.robinhood.urls import marketdata_options_url, option_orders_url, option_instruments_url, \
+    instruments_url
+
+from clients.client import ValidationClient, OptionsClient, StraddleQuote
+from clients.limiter import TokenBucket, mount_limiter
+from clients.search import SortedIndex
+from clients.robinhood_session import get_robinhood_session, refresh_authorization
 from log.mixins import LoggingMixin
 from log.metaclass import MethodLoggerMeta
+from metrics import metrics
+
+OPTION_TYPES = ("call", "put")
+# strikes either side of the nearest one whose marks are fetched along with it,
+# so a nearest pair without a mark price falls back without another round trip
+NEIGHBOUR_STRIKES = 1
+OPTION_REQUESTS_METRIC = "robinhood.option_requests"
+QUOTE_REQUESTS_METRIC = "robinhood.quote_requests"
+# most symbols / option instruments robinhood answers in one quotes / market data request
+QUOTE_BATCH_SIZE = 100
+OPTION_MARKET_DATA_BATCH_SIZE = 40
+OPTION_INSTRUMENTS_BATCH_SIZE = 40
+OPTION_ORDER_REQUESTS_METRIC = "robinhood.option_order_requests"
+# the columns of rh.export_completed_option_orders, one row per leg of a filled order
+OPTION_ORDER_COLUMNS = ["chain_symbol", "expiration_date", "strike_price", "option_type", "side", "order_created_at",
+                        "direction", "order_quantity", "order_type", "opening_strategy", "closing_strategy", "price",
+                        "processed_quantity"]
+
+ROBINHOOD_API_PREFIX = "https://api.robinhood.com/"
+# requests / s. the starting rate is conservative, it then adapts to the 429s robinhood sends
+LIMITER_RATE = 1.0
+LIMITER_MIN_RATE = 0.2
+LIMITER_MAX_RATE = 10.0
+LIMITER_METRIC = "robinhood.limiter"
+
+_limiter = None
+_limiter_lock = threading.Lock()
+# {symbol: options chain id}, chain ids never change so they are looked up once per process
+_chain_ids = dict()
+_chain_ids_lock = threading.Lock()
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parse_timestamp(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def get_robinhood_limiter() -> TokenBucket:
+    """
+    the token bucket every robin_stocks request goes through, shared by all clients in the process
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = TokenBucket(rate=LIMITER_RATE, min_rate=LIMITER_MIN_RATE,
+                                   max_rate=LIMITER_MAX_RATE, name=LIMITER_METRIC)
+            mount_limiter(SESSION, ROBINHOOD_API_PREFIX, _limiter, on_unauthorized=refresh_authorization)
+        return _limiter
 
 
 class RobinhoodBase(object):
-    def __init__(self, username=None, password=None, mfa_code=None, concurrency_limit=2, *args, **kwargs):
+    def __init__(self, username=None, password=None, mfa_code=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.username = username
         self.password = password
         self.mfa_code = mfa_code
         self._finalize = weakref.finalize(self, self.logout)
-        self.semaphore = Semaphore(concurrency_limit)
+        self.limiter = get_robinhood_limiter()
+        self.session = get_robinhood_session(username, password, mfa_code)
         self.login()
 
     def __enter__(self):
@@ -34,8 +90,10 @@ class RobinhoodBase(object):
         self._finalize()
 
     def login(self):
-        kwargs = {"username": self.username, "password": self.password, "mfa_code": self.mfa_code}
-        rh.login(**kwargs)
+        """
+        free unless there is no cached token yet: expired tokens are replaced when a request gets a 401
+        """
+        self.session.ensure_login()
 
     def logout(self):
         try:
@@ -51,8 +109,6 @@ class RobinhoodValidation(ValidationClient, RobinhoodBase):
         return name != ""
 
     def supports_options(self, ticker):
-        duration = 1 + random.randint(1, 3)
-        sleep(duration)
         res = rh.get_chains(symbol=ticker, info="expiration_dates")
         return res
 
@@ -93,14 +149,82 @@ class Robinhood(OptionsClient, RobinhoodBase):
     def export_option_trade_history(self, dir_path, file_name=None):
         return rh.export_completed_option_orders(dir_path, file_name)
 
+    def get_option_orders_since(self, updated_after=None) -> list:
+        """
+        option orders updated at or after updated_after (an iso timestamp, None for all of them), in any state.
+        an order is updated when it fills, so one placed long before it filled still shows up here.
+        robinhood pages orders by created_at, not updated_at, so every page of the query is read
+        """
+        self.login()
+        updated_after = parse_timestamp(updated_after) if updated_after else None
+        orders = []
+        url, payload = option_orders_url(), None
+        if updated_after is not None:
+            payload = {"updated_at[gte]": updated_after.isoformat()}
+        while url:
+            metrics.increment(OPTION_ORDER_REQUESTS_METRIC)
+            page = rh.request_get(url, "regular", payload)
+            if not page:
+                break
+            orders.extend(order for order in page.get("results", [])
+                          if updated_after is None or parse_timestamp(order["updated_at"]) >= updated_after)
+            url, payload = page.get("next"), None
+        return orders
+
+    def get_option_instruments(self, urls) -> dict:
+        """
+        {instrument url: instrument}, OPTION_INSTRUMENTS_BATCH_SIZE instruments per request
+        """
+        instruments = dict()
+        ids = {url.rstrip("/").rsplit("/", 1)[-1]: url for url in urls}
+        for batch in chunks(ids, OPTION_INSTRUMENTS_BATCH_SIZE):
+            metrics.increment(OPTION_REQUESTS_METRIC)
+            data = rh.request_get(option_instruments_url(), "pagination", {"ids": ",".join(batch)})
+            instruments.update({ids[instrument["id"]]: instrument for instrument in data or [] if instrument})
+        return instruments
+
+    def get_filled_option_legs(self, updated_after=None) -> tuple:
+        """
+        the legs of every filled option order updated at or after updated_after, oldest first, as
+        {column: value} rows laid out like export_option_trade_history's csv (see OPTION_ORDER_COLUMNS),
+        and the newest updated_at of any order seen: the updated_after of the next call (updated_after if none).
+        orders updated exactly at updated_after are returned again
+        """
+        orders = self.get_option_orders_since(updated_after)
+        high_water_mark = max((order["updated_at"] for order in orders), key=parse_timestamp, default=updated_after)
+        orders = sorted((order for order in orders if order.get("state") == "filled"),
+                        key=lambda order: parse_timestamp(order["created_at"]))
+        instruments = self.get_option_instruments({leg["option"] for order in orders for leg in order["legs"]})
+        rows = []
+        for order in orders:
+            for leg in order["legs"]:
+                instrument = instruments.get(leg["option"])
+                if instrument is None:
+                    instrument = rh.request_get(leg["option"])
+                rows.append({
+                    "chain_symbol": order["chain_symbol"],
+                    "expiration_date": instrument["expiration_date"],
+                    "strike_price": instrument["strike_price"],
+                    "option_type": instrument["type"],
+                    "side": leg["side"],
+                    "order_created_at": order["created_at"],
+                    "direction": order["direction"],
+                    "order_quantity": order["quantity"],
+                    "order_type": order["type"],
+                    "opening_strategy": order["opening_strategy"],
+                    "closing_strategy": order["closing_strategy"],
+                    "price": order["price"],
+                    "processed_quantity": order["processed_quantity"],
+                })
+        return rows, high_water_mark
+
     def find_options_by_expiration_and_strike(self, symbols, expiration_date, strike_price, info=None):
-        with self.semaphore:
-            self.login()
-            return rh.find_options_by_expiration_and_strike(
-                inputSymbols=symbols,
-                expirationDate=expiration_date,
-                strikePrice=strike_price,
-                info=info)
+        self.login()
+        return rh.find_options_by_expiration_and_strike(
+            inputSymbols=symbols,
+            expirationDate=expiration_date,
+            strikePrice=strike_price,
+            info=info)
 
     def find_option_mark_price(self, symbols, expiration_date, strike_price):
         options = self.find_options_by_expiration_and_strike(symbols, expiration_date, strike_price)
@@ -112,14 +236,13 @@ class Robinhood(OptionsClient, RobinhoodBase):
         return mark_price
 
     def find_options_mark_price_by_strike(self, input_symbols, strike_price, option_type=None, info=None):
-        with self.semaphore:
-            options = rh.find_options_by_strike(input_symbols, strike_price, option_type, info)
-            mark_price = []
-            if options:
-                mark_price = [
-                    option.get("mark_price", None) for option in options
-                ]
-            return mark_price
+        options = rh.find_options_by_strike(input_symbols, strike_price, option_type, info)
+        mark_price = []
+        if options:
+            mark_price = [
+                option.get("mark_price", None) for option in options
+            ]
+        return mark_price
 
     def get_earnings_report(self, symbol):
         earnings = rh.get_earnings(symbol=symbol, info="report")
@@ -135,10 +258,10 @@ class Robinhood(OptionsClient, RobinhoodBase):
 
     @staticmethod
     def get_closest(needle, haystack):
-        haystack.sort()
-        for potential in haystack:
-            if potential >= needle:
-                return potential
+        """
+        smallest value in haystack >= needle, haystack is left untouched
+        """
+        return SortedIndex(haystack).first_on_or_after(needle)
 
     def get_next_earnings_date(self, symbol):
         earnings = self.get_earnings_report(symbol)
@@ -146,10 +269,8 @@ class Robinhood(OptionsClient, RobinhoodBase):
         return self.get_closest(date.today(), earnings_dates)
 
     def get_options_chain(self, symbol):
-        with self.semaphore:
-            sleep(1 + random.randint(1, 3))
-            res = rh.get_chains(symbol=symbol, info="expiration_dates")
-            return res
+        res = rh.get_chains(symbol=symbol, info="expiration_dates")
+        return res
 
     def get_option_chain_dates(self, symbol):
         options_chain = self.get_options_chain(symbol)
@@ -158,6 +279,8 @@ class Robinhood(OptionsClient, RobinhoodBase):
         return []
 
     def get_chain_just_after_earnings(self, symbol):
+        import investpy
+
         expiration_dates = self.get_option_chain_dates(symbol)
         res = investpy.get_stock_information(stock=symbol, country='united states', as_json=True)
         earnings_date = datetime.strptime(earnings_date, "%d/%m/%Y")
@@ -165,10 +288,12 @@ class Robinhood(OptionsClient, RobinhoodBase):
             return self.get_closest(earnings_date.date(), expiration_dates)
 
     def get_latest_price(self, symbol):
-        with self.semaphore:
-            res = yf.Ticker(symbol)
-            price = res.history(period="1d")["Close"][0]
-            return price
+        import yfinance as yf
+        from clients.yfinance import get_shared_session
+
+        res = yf.Ticker(symbol, session=get_shared_session())
+        price = res.history(period="1d")["Close"][0]
+        return price
 
     @staticmethod
     def convert_to_float(arr):
@@ -182,32 +307,169 @@ class Robinhood(OptionsClient, RobinhoodBase):
 
     # @timeout(10, use_signals=False)
     def get_closest_option_mark_price(self, symbol, expiration_date, latest_price):
-        strike_price = latest_price
-        option_prices = []
-        while len(option_prices) == 0:
-            option_prices = self.find_option_mark_price(
-                symbol,
-                expiration_date=expiration_date,
-                strike_price=strike_price,
-            )
-            strike_price += 0.5
-            strike_price = round(strike_price, 1)
+        _, option_prices = self.get_closest_option_strike_and_mark_price(symbol, expiration_date, latest_price)
         return option_prices
 
+    def get_closest_option_strike_and_mark_price(self, symbol, expiration_date, latest_price):
+        """
+        the same requests whatever the spot price: the symbol's chain id (once per process), one request per
+        page of the strikes listed for the expiration, and one for the call / put marks at the strikes nearest
+        latest_price. the nearest pair with both marks wins. every request is counted in OPTION_REQUESTS_METRIC
+        """
+        self.login()
+        pairs = self.get_listed_option_pairs(symbol, expiration_date)
+        strikes = sorted(strike for strike, pair in pairs.items() if len(pair) == len(OPTION_TYPES))
+        candidates = self.closest_strikes(strikes, latest_price, 1 + 2 * NEIGHBOUR_STRIKES)
+        if not candidates:
+            return None, []
+        marks = self.get_option_marks([pairs[strike][option_type] for strike in candidates
+                                       for option_type in OPTION_TYPES])
+        for strike in candidates:
+            option_prices = [marks.get(pairs[strike][option_type]["id"]) for option_type in OPTION_TYPES]
+            if None not in option_prices:
+                return strike, option_prices
+        return None, []
+
+    def get_listed_option_pairs(self, symbol, expiration_date) -> dict:
+        """
+        {strike: {"call": instrument, "put": instrument}} for every active option expiring on expiration_date
+        """
+        chain_id = self.get_chain_id(symbol)
+        if chain_id is None:
+            return dict()
+        options = []
+        url = option_instruments_url()
+        payload = {"chain_id": chain_id, "chain_symbol": symbol.upper(), "state": "active",
+                   "expiration_dates": expiration_date}
+        while url:
+            metrics.increment(OPTION_REQUESTS_METRIC)
+            page = rh.request_get(url, "regular", payload)
+            if not page:
+                break
+            options.extend(page.get("results", []))
+            url, payload = page.get("next"), None
+        pairs = defaultdict(dict)
+        for option in options:
+            if option and option.get("expiration_date") == expiration_date:
+                pairs[float(option["strike_price"])][option["type"]] = option
+        return pairs
+
+    @staticmethod
+    def get_chain_id(symbol):
+        """
+        the options chain id of symbol, None when it has no options
+        """
+        symbol = symbol.upper().strip()
+        with _chain_ids_lock:
+            if symbol in _chain_ids:
+                return _chain_ids[symbol]
+        metrics.increment(OPTION_REQUESTS_METRIC)
+        instrument = rh.request_get(instruments_url(), "indexzero", {"symbol": symbol})
+        chain_id = instrument.get("tradable_chain_id") if instrument else None
+        with _chain_ids_lock:
+            _chain_ids[symbol] = chain_id
+        return chain_id
+
+    def get_option_marks(self, options) -> dict:
+        """
+        {instrument id: mark price} for options, OPTION_MARKET_DATA_BATCH_SIZE instruments per market data request
+        """
+        marks = dict()
+        for batch in chunks(options, OPTION_MARKET_DATA_BATCH_SIZE):
+            metrics.increment(OPTION_REQUESTS_METRIC)
+            data = rh.request_get(marketdata_options_url(), "results",
+                                  {"instruments": ",".join(option["url"] for option in batch)})
+            marks.update({
+                market_data["instrument_id"]: market_data.get("mark_price")
+                for market_data in data or [] if market_data
+            })
+        return marks
+
+    def get_latest_prices(self, symbols) -> dict:
+        """
+        {symbol: last regular session trade price} for every symbol robinhood knows, QUOTE_BATCH_SIZE per request.
+        extended hours prints are left out: the spot is set against regular session option marks
+        """
+        prices = dict()
+        for batch in chunks(symbols, QUOTE_BATCH_SIZE):
+            metrics.increment(QUOTE_REQUESTS_METRIC)
+            quotes = rh.get_quotes(batch)
+            for quote in quotes or []:
+                if not quote:
+                    continue
+                price = quote.get("last_trade_price")
+                if price is not None:
+                    prices[quote["symbol"]] = float(price)
+        return prices
+
+    def find_straddles(self, symbol_to_expiry_strike: dict) -> dict:
+        """
+        symbol_to_expiry_strike: {symbol: (expiration date, strike)} -> {symbol: [call mark, put mark]}.
+        listing the instruments costs one request per symbol, their marks are then fetched in batches
+        """
+        self.login()
+        pairs = dict()
+        for symbol, (expiration_date, strike) in symbol_to_expiry_strike.items():
+            pair = self.get_listed_option_pairs(symbol, expiration_date).get(float(strike), dict())
+            if len(pair) == len(OPTION_TYPES):
+                pairs[symbol] = pair
+        marks = self.get_option_marks([pair[option_type] for pair in pairs.values() for option_type in OPTION_TYPES])
+        straddles = dict()
+        for symbol, pair in pairs.items():
+            option_prices = [marks.get(pair[option_type]["id"]) for option_type in OPTION_TYPES]
+            if None not in option_prices:
+                straddles[symbol] = self.convert_to_float(option_prices)
+        return straddles
+
+    @staticmethod
+    def closest_strikes(strikes, price, num):
+        """
+        the num strikes nearest price, nearest first. strikes must be sorted
+        """
+        right = bisect.bisect_left(strikes, price)
+        left = right - 1
+        res = []
+        while len(res) < num and (left >= 0 or right < len(strikes)):
+            if right >= len(strikes) or (left >= 0 and price - strikes[left] <= strikes[right] - price):
+                res.append(strikes[left])
+                left -= 1
+            else:
+                res.append(strikes[right])
+                right += 1
+        return res
+
     def get_straddle_predicted_movement(self, symbol):
+        quote = self.get_straddle_quote(symbol)
+        if quote is None:
+            return None
+        return quote.straddle_predicted_movement
+
+    def get_straddle_quote(self, symbol, latest_price=None):
+        """
+        latest_price, e.g. from get_latest_prices, saves looking the spot price up again
+        """
+        from clients.yfinance import YFinance
+
         post_earnings_expiry_chain = YFinance(symbol).get_chain_just_after_earnings()
         # post_earnings_expiry_chain = self.get_chain_just_after_earnings(symbol)
         if not post_earnings_expiry_chain:
-            return
-        latest_price = self.get_latest_price(symbol)
+            return None
+        if latest_price is None:
+            latest_price = self.get_latest_price(symbol)
         try:
-            option_prices = self.get_closest_option_mark_price(symbol, str(post_earnings_expiry_chain),
-                                                               round(latest_price))
+            strike_price, option_prices = self.get_closest_option_strike_and_mark_price(
+                symbol, str(post_earnings_expiry_chain), latest_price)
         except TimeoutError as err:
-            self.log(err, logging.Error)
+            self.log(err, logging.ERROR)
+            return None
+        if strike_price is None:
             return None
         option_prices = self.convert_to_float(option_prices)
         straddle_price = sum(option_prices)
         straddle_predicted_movement = self.calculate_straddle_predicted_movement(straddle_price, latest_price)
         straddle_predicted_movement = round(straddle_predicted_movement, 2)
-        return straddle_predicted_movement
+        return StraddleQuote(expiration_date=str(post_earnings_expiry_chain),
+                             latest_price=latest_price,
+                             strike=strike_price,
+                             straddle_price=straddle_price,
+                             straddle_predicted_movement=straddle_predicted_movement)
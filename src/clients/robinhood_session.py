@@ -0,0 +1,155 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+import robin_stocks.robinhood as rh
+import robin_stocks.robinhood.helper as rh_helper
+from robin_stocks.robinhood.urls import login_url
+
+from env import parse_env_var
+from metrics import metrics
+
+TOKEN_CACHE_FILE_NAME = "robinhood_session.json"
+LOGIN_METRIC = "robinhood.logins"
+LOGIN_SECONDS_METRIC = "robinhood.login_seconds"
+
+
+class RobinhoodLoginException(Exception):
+    def __init__(self, username):
+        self.username = username
+        self.message = f"Error: could not log in to robinhood as {self.username}."
+        super().__init__(self.message)
+
+
+class TokenCache(object):
+    """
+    {username: {"token_type", "access_token", "refresh_token", "logged_in_at"}} in cache_dir, readable only by us.
+    the lock file serializes logins across processes, so a token one process logs in for is reused by the rest
+    """
+
+    def __init__(self, cache_dir):
+        self.file = os.path.join(cache_dir, TOKEN_CACHE_FILE_NAME)
+        self.lock_file = f"{self.file}.lock"
+
+    @contextmanager
+    def locked(self):
+        os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+        with open(self.lock_file, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def read(self) -> dict:
+        try:
+            with open(self.file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return dict()
+
+    def write(self, entries: dict):
+        tmp_file = f"{self.file}.{os.getpid()}.tmp"
+        with open(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.file)
+
+    def get(self, username) -> Optional[dict]:
+        return self.read().get(username)
+
+    def put(self, username, token: dict):
+        entries = self.read()
+        entries[username] = token
+        self.write(entries)
+
+
+class RobinhoodSession(object):
+    """
+    the robin_stocks login for one account. a cached token is put straight onto robin_stocks' session
+    without a round trip; a real login only happens when there is no cached token or a request came
+    back 401 with the current one (see refresh_authorization)
+    """
+
+    def __init__(self, username, password, mfa_code, cache: TokenCache):
+        self.username = username
+        self.password = password
+        self.mfa_code = mfa_code
+        self.cache = cache
+        self.lock = threading.RLock()
+        self.authorization = None
+
+    @staticmethod
+    def to_authorization(token: dict) -> str:
+        return f"{token['token_type']} {token['access_token']}"
+
+    def ensure_login(self, expired_authorization=None) -> str:
+        """
+        the Authorization header to use. expired_authorization is the one a request was rejected with:
+        it is replaced, unless another thread or process already did that
+        """
+        with self.lock:
+            if self.authorization is not None and self.authorization != expired_authorization \
+                    and rh_helper.LOGGED_IN:
+                return self.authorization
+            with self.cache.locked():
+                token = self.cache.get(self.username)
+                if token is None or self.to_authorization(token) == expired_authorization:
+                    token = self.login()
+                    self.cache.put(self.username, token)
+            self.apply(token)
+            return self.authorization
+
+    def login(self) -> dict:
+        """
+        store_session keeps robin_stocks' ~/.tokens pickle, and with it the device token robinhood knows
+        this machine by: logging in with a new device token every time draws sms / device approval
+        challenges, whose input() prompts would hang an unattended run
+        """
+        with metrics.timer(LOGIN_SECONDS_METRIC):
+            res = rh.login(username=self.username, password=self.password,
+                           mfa_code=self.mfa_code, store_session=True)
+        metrics.increment(LOGIN_METRIC)
+        if not isinstance(res, dict) or "access_token" not in res:
+            raise RobinhoodLoginException(self.username)
+        return {
+            "token_type": res["token_type"],
+            "access_token": res["access_token"],
+            "refresh_token": res.get("refresh_token"),
+            "logged_in_at": datetime.now().isoformat(),
+        }
+
+    def apply(self, token: dict):
+        self.authorization = self.to_authorization(token)
+        rh_helper.update_session("Authorization", self.authorization)
+        rh_helper.set_login_state(True)
+        global _active_session
+        _active_session = self
+
+
+_sessions = dict()
+_sessions_lock = threading.Lock()
+_active_session = None
+
+
+def get_robinhood_session(username, password, mfa_code) -> RobinhoodSession:
+    with _sessions_lock:
+        session = _sessions.get(username)
+        if session is None:
+            cache = TokenCache(parse_env_var("CACHE_LOCATION"))
+            session = RobinhoodSession(username, password, mfa_code, cache)
+            _sessions[username] = session
+        return session
+
+
+def refresh_authorization(request) -> Optional[str]:
+    """
+    called with a request robinhood answered 401: logs in again and returns the new Authorization header
+    """
+    session = _active_session
+    if session is None or request.url.startswith(login_url()):
+        return None
+    return session.ensure_login(expired_authorization=request.headers.get("Authorization"))
@@ -0,0 +1,130 @@
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class SortedIndex(object):
+    """
+    a sorted copy of values (dates, datetimes or strikes) answering lookups with np.searchsorted
+    """
+
+    def __init__(self, values):
+        self.values = np.sort(np.asarray(values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def first_on_or_after(self, needle):
+        """
+        smallest value >= needle, or None
+        """
+        i = np.searchsorted(self.values, needle, side="left")
+        if i < len(self.values):
+            return self.values[i]
+        return None
+
+    def nearest(self, needle):
+        """
+        value closest to needle, the smaller one on a tie, or None
+        """
+        if not len(self.values):
+            return None
+        i = np.searchsorted(self.values, needle, side="left")
+        if i == 0:
+            return self.values[0]
+        if i == len(self.values):
+            return self.values[-1]
+        before, after = self.values[i - 1], self.values[i]
+        return before if needle - before <= after - needle else after
+
+
+class TickerSearch(object):
+    """
+    per ticker sorted expirations, and sorted strikes per (ticker, expiration)
+    """
+
+    def __init__(self):
+        self.expirations = dict()
+        self.strikes = dict()
+        self.lock = threading.Lock()
+
+    def set_expirations(self, ticker, expirations):
+        with self.lock:
+            self.expirations[ticker] = SortedIndex(np.asarray(expirations, dtype="datetime64[D]"))
+
+    def set_strikes(self, ticker, expiration, strikes):
+        with self.lock:
+            self.strikes[(ticker, np.datetime64(expiration, "D"))] = SortedIndex(np.asarray(strikes, dtype=np.float64))
+
+    def next_expiration(self, ticker, on_or_after) -> Optional[np.datetime64]:
+        index = self.expirations.get(ticker)
+        if index is None:
+            return None
+        return index.first_on_or_after(np.datetime64(on_or_after, "D"))
+
+    def nearest_strike(self, ticker, expiration, price) -> Optional[float]:
+        index = self.strikes.get((ticker, np.datetime64(expiration, "D")))
+        if index is None:
+            return None
+        return index.nearest(price)
+
+    def next_expirations(self, tickers, on_or_after) -> list:
+        return batch_first_on_or_after([self.expirations.get(ticker) for ticker in tickers],
+                                       np.asarray(on_or_after, dtype="datetime64[D]"))
+
+    def nearest_strikes(self, tickers, expirations, prices) -> list:
+        indexes = [self.strikes.get((ticker, np.datetime64(expiration, "D")))
+                   for ticker, expiration in zip(tickers, expirations)]
+        return batch_nearest(indexes, np.asarray(prices, dtype=np.float64))
+
+
+def segment_keys(indexes, needles):
+    """
+    lays every index out in one sorted array: each value becomes (segment * span) + (value - lowest),
+    so a single np.searchsorted answers every needle within its own segment
+    """
+    present = [index.values for index in indexes if index is not None and len(index)]
+    values = np.concatenate(present) if present else np.empty(0, dtype=needles.dtype)
+    numeric = values.view(np.int64) if np.issubdtype(values.dtype, np.datetime64) else values
+    needle_numeric = needles.view(np.int64) if np.issubdtype(needles.dtype, np.datetime64) else needles
+    lowest = min(numeric.min(initial=0), needle_numeric.min(initial=0))
+    span = max(numeric.max(initial=0), needle_numeric.max(initial=0)) - lowest + 1
+
+    lengths = np.array([len(index) if index is not None else 0 for index in indexes], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    segments = np.repeat(np.arange(len(indexes)), lengths)
+    keys = segments * span + (numeric - lowest)
+    needle_keys = np.arange(len(indexes)) * span + (needle_numeric - lowest)
+    return values, keys, needle_keys, offsets
+
+
+def batch_first_on_or_after(indexes, needles) -> list:
+    """
+    [index.first_on_or_after(needle)] for many indexes in one vectorized call. missing indexes give None
+    """
+    needles = np.asarray(needles)
+    values, keys, needle_keys, offsets = segment_keys(indexes, needles)
+    positions = np.searchsorted(keys, needle_keys, side="left")
+    found = positions < offsets[1:]
+    return [values[position] if is_found else None for position, is_found in zip(positions, found)]
+
+
+def batch_nearest(indexes, needles) -> list:
+    """
+    [index.nearest(needle)] for many indexes in one vectorized call. missing or empty indexes give None
+    """
+    needles = np.asarray(needles)
+    values, keys, needle_keys, offsets = segment_keys(indexes, needles)
+    starts, ends = offsets[:-1], offsets[1:]
+    positions = np.searchsorted(keys, needle_keys, side="left")
+    after = np.minimum(positions, ends - 1)
+    before = np.maximum(positions - 1, starts)
+    is_empty = ends == starts
+    after = np.where(is_empty, 0, after)
+    before = np.where(is_empty, 0, before)
+    if not len(values):
+        return [None] * len(indexes)
+    use_before = (needles - values[before]) <= (values[after] - needles)
+    nearest = np.where(use_before, before, after)
+    return [None if empty else values[position] for position, empty in zip(nearest, is_empty)]
@@ -1,34 +1,135 @@
 import os.path
+import threading
+import time
+from contextlib import contextmanager
 from urllib.error import HTTPError
 from datetime import date
 import numpy as np
 import pandas as pd
 import logging
 
-from clients.client import ValidationClient, OptionsClient
+from clients.client import ValidationClient, OptionsClient, StraddleQuote
+from clients.search import SortedIndex
 import yfinance
 
 from requests import Session
+from requests.adapters import HTTPAdapter
 from requests_cache import CacheMixin, SQLiteCache
 from requests_ratelimiter import LimiterMixin, MemoryQueueBucket
 from pyrate_limiter import Duration, RequestRate, Limiter
 
 from env import parse_env_var
+from metrics import metrics
 from log.metaclass import MethodLoggerMeta
 
 __metaclass__ = MethodLoggerMeta
 
+LIMITER_WAIT_METRIC = "yfinance.limiter_wait_seconds"
+DEFAULT_POOL_SIZE = 32
+DEFAULT_CHAIN_TTL_SECONDS = 300
+
 
 class CachedLimiterSession(CacheMixin, LimiterMixin, Session):
     pass
 
 
+class MeteredLimiter(Limiter):
+    """
+    records how long every request waited for the rate limiter under LIMITER_WAIT_METRIC
+    """
+
+    @contextmanager
+    def ratelimit(self, *identities, **kwargs):
+        start = time.perf_counter()
+        with super().ratelimit(*identities, **kwargs):
+            metrics.observe(LIMITER_WAIT_METRIC, time.perf_counter() - start)
+            yield
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_shared_session() -> CachedLimiterSession:
+    """
+    one cached, rate limited session for the whole process, so max 2 requests per 5 seconds
+    is a global limit instead of a per ticker one
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            cache_dir = parse_env_var("CACHE_LOCATION")
+            _session = CachedLimiterSession(
+                limiter=MeteredLimiter(RequestRate(2, Duration.SECOND * 5)),  # max 2 requests per 5 seconds
+                bucket_class=MemoryQueueBucket,
+                backend=SQLiteCache(os.path.join(cache_dir, "yfinance.cache")))
+            mount_pool(_session, DEFAULT_POOL_SIZE)
+        return _session
+
+
+def mount_pool(session, pool_size):
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def configure_shared_session(pool_size):
+    """
+    sizes the shared session's connection pool for a thread pool of pool_size workers
+    """
+    session = get_shared_session()
+    if pool_size:
+        mount_pool(session, pool_size)
+    return session
+
+
+class IndexedOptionChain(object):
+    """
+    a yfinance option chain with its calls and puts indexed by strike
+    """
+
+    def __init__(self, chain, fetched_at):
+        self.chain = chain
+        self.fetched_at = fetched_at
+        self.call_prices = self.index_by_strike(chain.calls)
+        self.put_prices = self.index_by_strike(chain.puts)
+        self.call_strikes = SortedIndex(chain.calls["strike"].values)
+
+    @property
+    def calls(self):
+        return self.chain.calls
+
+    @property
+    def puts(self):
+        return self.chain.puts
+
+    @staticmethod
+    def index_by_strike(options):
+        prices = dict()
+        for strike, price in zip(options["strike"].values, options["lastPrice"].values):
+            prices.setdefault(strike, price)
+        return prices
+
+    def call_price(self, strike):
+        return self.call_prices[strike]
+
+    def put_price(self, strike):
+        return self.put_prices[strike]
+
+    def closest_call_strike(self, price):
+        """
+        smallest listed call strike >= price
+        """
+        return self.call_strikes.first_on_or_after(price)
+
+
 class YFinanceValidation(ValidationClient, object):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.session = get_shared_session()
 
     def exists(self, ticker) -> bool:
-        ticker = yfinance.Ticker(ticker=ticker)
+        ticker = yfinance.Ticker(ticker=ticker, session=self.session)
         does_exist = True
         try:
             ticker.info
@@ -38,7 +139,7 @@ class YFinanceValidation(ValidationClient, object):
         return does_exist
 
     def supports_options(self, ticker) -> bool:
-        ticker = yfinance.Ticker(ticker=ticker)
+        ticker = yfinance.Ticker(ticker=ticker, session=self.session)
         supports_options = True
         try:
             ticker.option_chain()
@@ -48,7 +149,7 @@ class YFinanceValidation(ValidationClient, object):
         return supports_options
 
     def has_future_earnings_dates(self, ticker: str) -> bool:
-        ticker = yfinance.Ticker(ticker=ticker)
+        ticker = yfinance.Ticker(ticker=ticker, session=self.session)
         earnings_dates = ticker.get_earnings_dates()
         if earnings_dates is not None:
             return not earnings_dates[
@@ -57,19 +158,21 @@ class YFinanceValidation(ValidationClient, object):
 
 
 class YFinance(OptionsClient, object):
-    def __init__(self, ticker, *args, **kwargs):
+    __log_exclude__ = {"today", "get_closest", "convert_to_dates"}
+
+    def __init__(self, ticker, chain_ttl=DEFAULT_CHAIN_TTL_SECONDS, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        cache_dir = parse_env_var("CACHE_LOCATION")
-        self.session = CachedLimiterSession(
-            limiter=Limiter(RequestRate(2, Duration.SECOND * 5)),  # max 2 requests per 5 seconds
-            bucket_class=MemoryQueueBucket,
-            backend=SQLiteCache(os.path.join(cache_dir, "yfinance.cache")))
+        self.session = get_shared_session()
         self.ticker = yfinance.Ticker(ticker=ticker, session=self.session)
+        self.chain_ttl = chain_ttl
+        self.chains = dict()
+        self.chains_lock = threading.Lock()
+        self.expirations = None
 
     def exists(self, ticker=None):
         to_validate = self.ticker
         if ticker:
-            to_validate = yfinance.Ticker(ticker=ticker)
+            to_validate = yfinance.Ticker(ticker=ticker, session=self.session)
         does_exist = True
         try:
             to_validate.info
@@ -80,9 +183,15 @@ class YFinance(OptionsClient, object):
 
     def get_chain_just_after_earnings(self):
         next_earnings_date = self.get_next_earnings_date()
-        option_expirations = self.get_option_chain_dates()
-        return self.get_closest(needle=next_earnings_date,
-                                haystack=option_expirations)
+        return self.get_expiration_index().first_on_or_after(next_earnings_date)
+
+    def get_expiration_index(self) -> SortedIndex:
+        """
+        the ticker's option expirations, sorted once
+        """
+        if self.expirations is None:
+            self.expirations = SortedIndex(self.get_option_chain_dates())
+        return self.expirations
 
     def get_option_chain_dates(self):
         as_list = list(self.ticker.options)
@@ -116,8 +225,20 @@ class YFinance(OptionsClient, object):
         earnings = self.ticker.get_earnings_dates()
         return earnings.index.values
 
-    def get_option_chain(self, expiration_date=None):
-        return self.ticker.option_chain(expiration_date)
+    def get_option_chain(self, expiration_date=None) -> IndexedOptionChain:
+        """
+        option chains are memoized per expiration for chain_ttl seconds
+        """
+        with self.chains_lock:
+            chain = self.chains.get(expiration_date)
+            if chain is None or time.monotonic() - chain.fetched_at >= self.chain_ttl:
+                chain = IndexedOptionChain(self.ticker.option_chain(expiration_date), time.monotonic())
+                self.chains[expiration_date] = chain
+            return chain
+
+    def invalidate_option_chains(self):
+        with self.chains_lock:
+            self.chains.clear()
 
     def get_put_option_chain(self, expiration_date):
         return self.get_option_chain(expiration_date=expiration_date).puts
@@ -131,27 +252,29 @@ class YFinance(OptionsClient, object):
         return sum([call_price, put_price])
 
     def get_call_price(self, expiration_date, strike):
-        call_option_chain = self.get_call_option_chain(expiration_date=expiration_date)
-        calls_at_strike = call_option_chain[(call_option_chain["strike"].values == strike)]
-        price = calls_at_strike["lastPrice"][calls_at_strike.index[0]]
-        return price
+        return self.get_option_chain(expiration_date=expiration_date).call_price(strike)
 
     def get_put_price(self, expiration_date, strike):
-        put_option_chain = self.get_put_option_chain(expiration_date=expiration_date)
-        puts_at_strike = put_option_chain[(put_option_chain["strike"].values == strike)]
-        price = puts_at_strike["lastPrice"][puts_at_strike.index[0]]
-        return price
+        return self.get_option_chain(expiration_date=expiration_date).put_price(strike)
+
+    def get_straddle_predicted_movement(self, symbol=None) -> float:
+        return self.get_straddle_quote(symbol).straddle_predicted_movement
 
-    def get_straddle_predicted_movement(self) -> float:
+    def get_straddle_quote(self, symbol=None, latest_price=None) -> StraddleQuote:
         expiration_date = self.get_chain_just_after_earnings()
         expiration_date = str(expiration_date)
-        latest_price = self.get_latest_price()
+        if latest_price is None:
+            latest_price = self.get_latest_price()
         option_chain = self.get_option_chain(expiration_date)
-        closest_strike_to_latest_price = self.get_closest(latest_price, option_chain.calls["strike"].values)
+        closest_strike_to_latest_price = option_chain.closest_call_strike(latest_price)
         straddle_price = self.get_straddle_price(expiration_date=expiration_date, strike=closest_strike_to_latest_price)
         straddle_predicted_movement = self.calculate_straddle_predicted_movement(straddle_price, latest_price)
         straddle_predicted_movement = round(straddle_predicted_movement, 2)
-        return straddle_predicted_movement
+        return StraddleQuote(expiration_date=expiration_date,
+                             latest_price=latest_price,
+                             strike=closest_strike_to_latest_price,
+                             straddle_price=straddle_price,
+                             straddle_predicted_movement=straddle_predicted_movement)
 
     @staticmethod
     def today(*args, **kwargs):
@@ -159,10 +282,10 @@ class YFinance(OptionsClient, object):
 
     @staticmethod
     def get_closest(needle, haystack):
-        haystack.sort()
-        for potential in haystack:
-            if potential >= needle:
-                return potential
+        """
+        smallest value in haystack >= needle, haystack is left untouched
+        """
+        return SortedIndex(haystack).first_on_or_after(needle)
 
     @staticmethod
     def convert_to_dates(arr):
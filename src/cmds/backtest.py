@@ -0,0 +1,36 @@
+import time
+
+import pandas as pd
+
+from cmds.cmd import Cmd
+from strategies.backtest import EventTable, backtest_straddles, DEFAULT_IMPLIED_MOVES, DEFAULT_WINDOWS
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+
+class Backtest(Cmd, LoggingMixin):
+    def __init__(self, data_dir, days, implied_moves=None, windows=None, max_workers=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_dir = data_dir
+        self.implied_moves = implied_moves or DEFAULT_IMPLIED_MOVES
+        self.windows = windows or sorted(set(DEFAULT_WINDOWS) | {days})
+        self.max_workers = max_workers
+
+    def execute(self):
+        start = time.perf_counter()
+        events = EventTable.load(self.data_dir, max_workers=self.max_workers)
+        loaded = time.perf_counter()
+        df = backtest_straddles(events, self.implied_moves, self.windows)
+        done = time.perf_counter()
+        self.print(df)
+        num_tickers = int((events.lengths > 0).sum())
+        message = f"Backtested {len(events)} earnings of {num_tickers} tickers in {self.data_dir} " \
+                  f"for {len(self.windows)} windows x {len(self.implied_moves)} implied moves " \
+                  f"(load {loaded - start:.2f}s, backtest {done - loaded:.2f}s)"
+        self.log(message)
+        print(message)
+
+    def print(self, df: pd.DataFrame):
+        print(df.to_string(index=False))
@@ -0,0 +1,23 @@
+import time
+
+from cmds.cmd import Cmd
+from store import EarningsStore
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+
+class BuildStore(Cmd, LoggingMixin):
+    def __init__(self, data_dir, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_dir = data_dir
+        self.store = EarningsStore(data_dir)
+
+    def execute(self):
+        start = time.perf_counter()
+        num_tickers = self.store.convert()
+        elapsed = time.perf_counter() - start
+        message = f"Stored {num_tickers} tickers from {self.data_dir} in {self.store.store_dir} ({elapsed:.2f}s)"
+        self.log(message)
+        print(message)
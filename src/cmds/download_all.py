@@ -1,6 +1,11 @@
-from clients import *
+import logging
+import os
+
+from clients.robinhood import Robinhood
 from env import *
-from scraper import Downloader
+from optionslam import get_optionslam_downloader
+from store import EarningsStore
+from sync import SyncManifest, SyncStatus
 import concurrent.futures
 
 from cmds.cmd import Cmd
@@ -14,7 +19,7 @@ class DownloadAll(Cmd, LoggingMixin):
     def __init__(self, dest_dir, client_username,
                  client_password, client_mfa,
                  optionslam_username, optionslam_password,
-                 ignore, *args, **kwargs):
+                 ignore, sync_ttl, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.dest_dir = dest_dir
         self.client_username = client_username
@@ -23,12 +28,33 @@ class DownloadAll(Cmd, LoggingMixin):
         self.optionslam_username = optionslam_username
         self.optionslam_password = optionslam_password
         self.ignore = ignore
+        self.store = EarningsStore(dest_dir)
+        self.optionslam = get_optionslam_downloader(optionslam_username, optionslam_password)
+        self.manifest = SyncManifest(dest_dir, ttl_days=sync_ttl)
 
     def execute(self):
-        symbols_to_fetch = self.watchlist_symbols()
+        symbols = self.watchlist_symbols()
+        symbols_to_fetch = self.filter_due(symbols)
         with concurrent.futures.ThreadPoolExecutor() as executor:
             future_to_symbol = self.submit_download_to_executor(executor, symbols_to_fetch)
-        self.resolve_futures(future_to_symbol)
+        counts = self.resolve_futures(future_to_symbol)
+        counts[SyncStatus.skipped] = len(symbols) - len(symbols_to_fetch)
+        self.manifest.save()
+        self.update_store(counts[SyncStatus.fetched])
+        self.report(counts)
+
+    def filter_due(self, symbols):
+        return [
+            symbol for symbol in symbols
+            if self.manifest.is_due(symbol, self.get_ticker_destination_file(ticker=symbol))
+        ]
+
+    def report(self, counts):
+        message = f"fetched: {len(counts[SyncStatus.fetched])}, " \
+                  f"skipped: {counts[SyncStatus.skipped]}, " \
+                  f"unchanged: {len(counts[SyncStatus.unchanged])}"
+        self.log(message)
+        print(message)
 
     def watchlist_symbols(self):
         rh = Robinhood(username=self.client_username, password=self.client_password, mfa_code=self.client_mfa)
@@ -44,37 +70,18 @@ class DownloadAll(Cmd, LoggingMixin):
     def filter_watchlists(self, watchlists):
         return {k: v for k, v in watchlists.items() if k not in self.ignore}
 
-    @staticmethod
-    def download(ticker, optionslam_username, optionslam_password, file):
-
-        login_payload = {
-            "username": optionslam_username,
-            "password": optionslam_password,
-            "next": "/"
-        }
-
-        headers = {
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "same-origin",
-            "Connection": "keep-alive",
-            "Origin": "https://www.optionslam.com",
-            "Host": "www.optionslam.com",
-            "Method": "POST",
-            "Referer": "https://www.optionslam.com/accounts/login/",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/112.0"
-        }
-
-        with Downloader(needs_login=True, login_payload=login_payload,
-                        base_url="https://www.optionslam.com",
-                        download_postfix="/earnings/excel/" + ticker,
-                        login_postfix="/accounts/os_login/",
-                        csrf_attr="csrfmiddlewaretoken",
-                        headers=headers) as d:
-            d.download(file)
-        return f"Finished Downloading symbol: {ticker} to file: {file}"
+    def download(self, ticker, file):
+        validators = self.manifest.validators(ticker, file)
+        response = self.optionslam.fetch_ticker(ticker, **validators)
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if response.status_code == 304:
+            return SyncStatus.unchanged, etag, last_modified, None
+        # an error or the login page must not replace the csv, nor count as a download
+        self.optionslam.check_response(ticker, response)
+        if self.manifest.is_unchanged(ticker, response.content, file):
+            return SyncStatus.unchanged, etag, last_modified, None
+        self.optionslam.save(response.content, file)
+        return SyncStatus.fetched, etag, last_modified, response.content
 
     def get_ticker_destination_file(self, ticker: str):
         return os.path.join(
@@ -83,7 +90,7 @@ class DownloadAll(Cmd, LoggingMixin):
         )
 
     def get_ticker_data_dir(self, ticker: str):
-        return f"{self.data_dir}/{ticker}/"
+        return f"{self.dest_dir}/{ticker}/"
 
     def submit_download_to_executor(self, executor, tickers):
         future_to_symbol = dict()
@@ -92,19 +99,28 @@ class DownloadAll(Cmd, LoggingMixin):
             future = executor.submit(
                 self.download,
                 ticker,
-                self.optionslam_username,
-                self.optionslam_password,
                 destination_file
             )
             future_to_symbol[future] = ticker
         return future_to_symbol
 
     def resolve_futures(self, futures):
+        counts = {SyncStatus.fetched: [], SyncStatus.unchanged: []}
         for future in concurrent.futures.as_completed(futures):
             res = futures[future]
             try:
-                data = future.result()
+                status, etag, last_modified, content = future.result()
             except Exception as exc:
                 self.log('%r generated an exception: %s' % (res, exc), logging.ERROR)
             else:
-                self.log(data)
+                self.log(f"{status.name} symbol: {res}")
+                self.manifest.record(res, self.get_ticker_destination_file(ticker=res),
+                                     etag=etag, last_modified=last_modified, content=content)
+                counts[status].append(res)
+        return counts
+
+    def update_store(self, tickers):
+        if not self.store.exists():
+            return
+        tickers_to_files = {ticker: self.get_ticker_destination_file(ticker=ticker) for ticker in tickers}
+        self.store.write(tickers_to_files)
@@ -38,20 +38,27 @@ for each idx, group in group_by_opening_strategy:
 
 
 '''
+import json
 import math
 import os.path
+import time
 from enum import Enum
+from typing import Optional
 
 import pandas as pd
 from pandas import DataFrame
 
 from cmds.cmd import Cmd
-from clients import Robinhood
+from clients.robinhood import Robinhood, OPTION_ORDER_COLUMNS
+from trades import match_trades
 from log.mixins import LoggingMixin
 from log.metaclass import MethodLoggerMeta
 
 __metaclass__ = MethodLoggerMeta
 
+STATE_FILE_SUFFIX = ".state.json"
+TRADES_FILE_SUFFIX = "_trades.csv"
+
 
 class OptionStrategy(Enum):
     long_call = 0
@@ -76,36 +83,140 @@ class Journal(LoggingMixin):
         self.mfa = client_mfa
         self.client = Robinhood(username=self.username, password=self.password, mfa_code=self.mfa)
 
+    @property
+    def state_file(self):
+        return f"{self.abs_file_path}{STATE_FILE_SUFFIX}"
+
+    @property
+    def trades_file(self):
+        return f"{os.path.splitext(self.abs_file_path)[0]}{TRADES_FILE_SUFFIX}"
+
+    def journal_stat(self) -> Optional[list]:
+        try:
+            stat = os.stat(self.abs_file_path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get_high_water_mark(self) -> Optional[str]:
+        """
+        updated_at of the newest option order seen by the last update, None for an empty journal.
+        it is kept next to the journal; when the journal changed behind our back it falls back to the newest
+        order_created_at in journal.csv, which has no updated_at: orders can only have been updated after that
+        """
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+            if state.get("journal") == self.journal_stat():
+                return state.get("high_water_mark")
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            pass
+        if self.journal_stat() is None:
+            return None
+        created_at = pd.to_datetime(pd.read_csv(self.abs_file_path, usecols=["order_created_at"])["order_created_at"],
+                                    utc=True)
+        return created_at.max().isoformat() if len(created_at.dropna()) else None
+
+    def set_high_water_mark(self, high_water_mark: str):
+        tmp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"high_water_mark": high_water_mark, "journal": self.journal_stat()}, f)
+        os.replace(tmp_file, self.state_file)
+
 
 class JournalUpdate(Cmd, Journal):
+    """
+    appends the option orders filled since the last run to journal.csv and recalculates the trades of
+    the symbols they traded in journal_trades.csv, along with the symbols whose open trades have expired since
+    """
+
     def execute(self):
-        print("Hello, d")
+        start = time.perf_counter()
+        high_water_mark = self.get_high_water_mark()
+        rows, new_high_water_mark = self.client.get_filled_option_legs(updated_after=high_water_mark)
+        rows = self.drop_journaled(rows)
+        if rows:
+            self.append(rows)
+        if rows or new_high_water_mark != high_water_mark:
+            self.set_high_water_mark(new_high_water_mark)
+        traded = sorted({row["chain_symbol"] for row in rows})
+        expired = sorted(self.expired_open_symbols() - set(traded))
+        if not traded and not expired:
+            print(f"{self.abs_file_path} is up to date, newest order update: {new_high_water_mark} "
+                  f"({time.perf_counter() - start:.2f}s)")
+            return
+        symbols = traded + expired
+        trades = self.update_trades(symbols)
+        print(trades[trades["chain_symbol"].isin(symbols)].to_string(index=False))
+        if traded:
+            print(f"Added {len(rows)} legs of {', '.join(traded)} to {self.abs_file_path}")
+        if expired:
+            print(f"Matched the expired open trades of {', '.join(expired)} again")
+        print(f"Updated {self.trades_file} ({time.perf_counter() - start:.2f}s)")
+
+    def expired_open_symbols(self) -> set:
+        """
+        symbols with a trade in journal_trades.csv still open past its expiration: it expired since it was matched
+        """
+        if not os.path.exists(self.trades_file):
+            return set()
+        trades = pd.read_csv(self.trades_file, usecols=["chain_symbol", "expiration_date", "status"],
+                             parse_dates=["expiration_date"])
+        is_expired = (trades["status"] == "open") & (trades["expiration_date"] < pd.Timestamp.now().normalize())
+        return set(trades.loc[is_expired, "chain_symbol"])
+
+    def drop_journaled(self, rows: list) -> list:
+        """
+        rows of orders not in journal.csv yet: the orders updated exactly at the high water mark come back,
+        and so does every order after a fallback to order_created_at
+        """
+        if not rows or self.journal_stat() is None:
+            return rows
+        journaled = pd.read_csv(self.abs_file_path, usecols=["chain_symbol", "order_created_at"])
+        journaled = set(zip(journaled["chain_symbol"], pd.to_datetime(journaled["order_created_at"], utc=True)))
+        return [row for row in rows
+                if (row["chain_symbol"], pd.Timestamp(row["order_created_at"])) not in journaled]
+
+    def append(self, rows: list):
+        """
+        one write for every new leg, the header only when journal.csv is new
+        """
+        is_new = self.journal_stat() is None
+        pd.DataFrame(rows, columns=OPTION_ORDER_COLUMNS).to_csv(self.abs_file_path, mode="a", header=is_new,
+                                                                index=False)
+
+    def update_trades(self, symbols: list) -> DataFrame:
+        """
+        journal_trades.csv with the trades of symbols matched again, the other symbols' trades are kept as they are
+        """
+        legs = pd.read_csv(self.abs_file_path)
+        if os.path.exists(self.trades_file):
+            kept = pd.read_csv(self.trades_file, parse_dates=["opened_at", "expiration_date", "closed_at"])
+            kept = kept[~kept["chain_symbol"].isin(symbols)]
+            legs = legs[legs["chain_symbol"].isin(symbols)]
+        else:
+            kept = None
+        trades = match_trades(legs)
+        if kept is not None and len(kept):
+            trades = pd.concat([kept, trades], ignore_index=True)
+        trades = trades.sort_values("opened_at", kind="stable", ignore_index=True)
+        trades.to_csv(self.trades_file, index=False)
+        return trades
 
 
 class JournalBackfill(Cmd, Journal):
     def execute(self):
         # self.export_option_trade_history()
         df = self.get_dataframe()
-        grouped_by_opening = df.groupby(["chain_symbol", "opening_strategy", "order_created_at"])
-        grouped_by_closing = df.groupby(["chain_symbol", "closing_strategy"])
-        for idx, open_group in grouped_by_opening:
-            chain_symbol, opening_strategy, order_created_at = idx[0], idx[1], idx[2]
-            try:
-                close_group = grouped_by_closing.get_group((chain_symbol, opening_strategy))
-            except KeyError as err:
-                print(err)
-            strikes_traded_open = " ".join(str(val) for val in open_group["strike_price"].values)
-            strikes_traded_close = " ".join(str(val) for val in open_group["strike_price"].values)
-            num_contracts_traded = int(open_group["order_quantity"].sum())
-            # premium_open = " ".join(str(val) for val in group["price"].values)
-            trade_exit_date = close_group["order_created_at"].values
-            premium_close = close_group["price"].values
-            premium_open = open_group["price"].values
-            strategy = opening_strategy if not opening_strategy == "nan" else close_group
-            # profit = self.calculate_profit(premium_open, premium_close, OptionStrategy(strategy))
-            print(f"{chain_symbol}, enter date: {order_created_at}, exit_date: {trade_exit_date}, {opening_strategy}, "
-                  f"# contracts: {num_contracts_traded}, strikes open: {strikes_traded_open}, "
-                  f"strikes close: {strikes_traded_close}, premium open: {premium_open}, premium close: {premium_close}")
+        trades = match_trades(df)
+        self.print(trades)
+
+    def print(self, trades: DataFrame):
+        pd.set_option('display.max_columns', None)
+        pd.set_option('display.max_rows', None)
+        print(trades)
+        pd.reset_option('display.max_columns')
+        pd.reset_option('display.max_rows')
 
     def calculate_profit(self, open, close, num_contracts, strategy):
         if strategy == OptionStrategy.long_put_spread:
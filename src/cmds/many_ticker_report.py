@@ -1,19 +1,98 @@
 import concurrent.futures
+import logging
 import os
+import sys
+import threading
 from collections import deque
+from contextlib import closing
 from itertools import islice
 from typing import List
 
-import numpy as np
-
-from clients import *
+from env import parse_env_var
 from cmds.cmd import Cmd
 from dataframe import *
-from scraper import Downloader
+from optionslam import get_optionslam_downloader
+from store import EarningsStore
 from strategies.statistics import Statistics
 from strategies.mixins import StatisticFactory
 from validators.mixins import ValidatorMixin
-from clients.mixins import create_client, create_rh_client, Clients
+from validators.cache import VerdictCache
+from accumulator import ColumnAccumulator
+from report_stream import ReportStream, RunningTop, StreamFormats, DEFAULT_TOP
+from pipeline import Pipeline, ThreadStage, ProcessStage, StageError, DEFAULT_QUEUE_SIZE
+from strategies.quote import QuoteContext
+from clients.mixins import create_client, create_rh_client, Clients, ClientFactory, ClientPool
+from clients.yfinance import configure_shared_session
+from clients.client import OptionsClient, StraddleQuote
+
+DEFAULT_CLIENT_POOL_SIZE = 32
+# tickers per process pool task in the pipeline's statistics stage
+STATISTICS_BATCH_SIZE = 8
+
+
+class SkippedTickerException(Exception):
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.message = f"{self.ticker} is not valid, skipped."
+        super().__init__(self.message)
+
+
+class TickerInput(object):
+    """
+    everything the statistics stage needs for one ticker, fetched by the quotes stage. pickled to a worker process
+    """
+
+    def __init__(self, ticker, file, days, show_quote, quote=None, quote_error=None, earning_date=None):
+        self.ticker = ticker
+        self.file = file
+        self.days = days
+        self.show_quote = show_quote
+        self.quote = quote
+        self.quote_error = quote_error
+        self.earning_date = earning_date
+
+    def __repr__(self):
+        return f"TickerInput(ticker={self.ticker})"
+
+
+def calculate_statistics(stat_factory: StatisticFactory, source_file, ticker, client):
+    data = dict()
+    for statistic in Statistics:
+        statistic_strategy = stat_factory.create(stat=statistic, file=source_file, ticker=ticker, client=client)
+        title, stat = statistic_strategy.execute()
+        stats = data.get(title, [])
+        if len(stat.index) > 0:
+            stats.append(stat[stat.index[0]])
+        else:
+            stats.append(None)
+        data[title] = stats
+    return data
+
+
+def assemble_statistics(inputs: List[TickerInput]) -> list:
+    """
+    the report rows for a batch of tickers whose quotes are already known, run in a worker process.
+    a ticker that fails comes back as a StageError
+    """
+    rows = []
+    for ticker_input in inputs:
+        quotes = QuoteContext()
+        quotes.seed(ticker_input.ticker, ticker_input.quote, ticker_input.quote_error)
+        try:
+            data = calculate_statistics(StatisticFactory(ticker_input.days, quotes),
+                                        ticker_input.file, ticker_input.ticker, client=None)
+        except Exception as e:
+            # exceptions with extra constructor arguments do not always unpickle
+            rows.append(StageError("statistics", ticker_input, RuntimeError(f"{type(e).__name__}: {e}")))
+            continue
+        if ticker_input.show_quote:
+            quote = ticker_input.quote or StraddleQuote(None, None, None, None, None)
+            for k, v in quote.as_dict().items():
+                data[k] = [v]
+        data["ticker"] = [ticker_input.ticker]
+        data["earning date"] = ticker_input.earning_date
+        rows.append(data)
+    return rows
 
 
 class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
@@ -21,9 +100,12 @@ class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
                  days: int, client_username: str,
                  client_password: str, client_mfa: str,
                  optionslam_username: str, optionslam_password: str,
-                 data_dir: str, *args, **kwargs):
+                 data_dir: str, show_quote: bool = False, stream_format: str = None,
+                 stream_file: str = None, top: int = DEFAULT_TOP, pipeline: bool = False,
+                 cpu_workers: int = None, queue_size: int = DEFAULT_QUEUE_SIZE, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.max_workers = max_workers
+        configure_shared_session(max_workers)
         self.ticker = tickers
         self.days = days
         self.optionslam_username = optionslam_username
@@ -32,24 +114,145 @@ class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
                                           password=client_password,
                                           mfa_code=client_mfa)
         self.stat_factory = StatisticFactory(days)
+        self.clients = ClientPool(factory=ClientFactory(username=client_username,
+                                                        password=client_password,
+                                                        mfa_code=client_mfa),
+                                  client_type=Clients.y_finance,
+                                  max_size=max_workers or DEFAULT_CLIENT_POOL_SIZE)
         self.data_dir = data_dir
+        self.show_quote = show_quote
+        self.stream_format = StreamFormats[stream_format] if stream_format else None
+        self.stream_file = stream_file
+        self.top = top
+        self.pipeline = pipeline
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.store = EarningsStore(data_dir)
+        self.verdicts = VerdictCache(parse_env_var("CACHE_LOCATION"))
+        self.optionslam = get_optionslam_downloader(optionslam_username, optionslam_password)
+        self.downloaded = dict()
+        self.downloaded_lock = threading.Lock()
 
     def execute(self):
         tickers_with_upcoming_earnings = self.get_upcoming_earnings_tickers()
+        if self.stream_format is not None:
+            self.execute_streaming(tickers_with_upcoming_earnings)
+            return
         valid_tickers = self.filter_valid_tickers(tickers_with_upcoming_earnings)
+        self.prefetch_prices(valid_tickers)
+        if self.pipeline:
+            with closing(self.pipeline_results(valid_tickers)) as results:
+                df = self.accumulate(results)
+            self.print(self.reorder_cols(df))
+            return
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             future_to_symbol = self.submit_fn_to_executor(executor,
                                                           self.assemble_data,
                                                           valid_tickers)
-        data = self.resolve_futures(future_to_symbol)
-        df = pd.DataFrame.from_dict(data)
+        df = self.resolve_futures(future_to_symbol)
         df = self.reorder_cols(df)
         self.print(df)
 
-    def print(self, df: pd.DataFrame):
+    def execute_streaming(self, tickers: List[str]):
+        """
+        writes every row as soon as its ticker is done and only keeps the running top rows,
+        then prints those as the final table. each ticker is validated (and downloaded) in the same task
+        as its statistics, so the first row does not wait for the whole universe to be validated;
+        spot prices are looked up per ticker instead of prefetched for all of them
+        """
+        validation_client = create_client(client_type=Clients.y_finance_validation)
+        out = open(self.stream_file, "w", newline="") if self.stream_file else sys.stdout
+        try:
+            stream = ReportStream(self.stream_format, out=out, top=self.top)
+            if self.pipeline:
+                # closed on any error writing a row, so the pipeline stops and the process can exit
+                with closing(self.pipeline_results(tickers, validation_client)) as results:
+                    for res in results:
+                        stream.write(res)
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    future_to_symbol = self.submit_fn_to_executor(
+                        executor,
+                        lambda ticker, file: self.validate_and_assemble_data(ticker, file, validation_client),
+                        tickers)
+                    self.stream_futures(future_to_symbol, stream)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+            self.verdicts.save()
+            self.update_store(self.downloaded)
+        # keep jsonl / csv on stdout parseable: the table goes to stderr then
+        table_out = sys.stderr if out is sys.stdout and self.stream_format != StreamFormats.text else sys.stdout
+        self.log(f"streamed {stream.num_rows} rows", logging.INFO)
+        self.print(stream.close(), file=table_out)
+
+    def stream_futures(self, futures, stream: ReportStream):
+        for future in concurrent.futures.as_completed(futures):
+            # drop our reference so the finished future and its row can be freed
+            ticker = futures.pop(future)
+            try:
+                res = future.result()
+            except SkippedTickerException:
+                continue
+            except Exception as exc:
+                self.log('%r generated an exception: %s' % (ticker, exc), logging.ERROR)
+            else:
+                stream.write(res)
+
+    def pipeline_results(self, tickers: List[str], validation_client=None):
+        """
+        report rows from a two stage pipeline: max_workers threads fetch quotes and earning dates,
+        cpu_workers processes calculate the statistics. yields rows as they complete.
+        with a validation_client, the quotes stage validates each ticker first and drops the invalid ones
+        """
+        fetch = self.fetch_ticker_input
+        if validation_client is not None:
+            fetch = lambda ticker: self.fetch_ticker_input(self.validate_streamed_ticker(ticker, validation_client))
+        pipeline = Pipeline("report", [
+            ThreadStage("quotes", fetch, workers=self.max_workers or DEFAULT_CLIENT_POOL_SIZE,
+                        queue_size=self.queue_size),
+            ProcessStage("statistics", assemble_statistics, workers=self.cpu_workers,
+                         batch_size=STATISTICS_BATCH_SIZE, queue_size=self.queue_size),
+        ], queue_size=self.queue_size)
+        with closing(pipeline.results(tickers)) as results:
+            for res in results:
+                if isinstance(res, StageError) and isinstance(res.error, SkippedTickerException):
+                    continue
+                if isinstance(res, StageError):
+                    ticker = getattr(res.item, "ticker", res.item)
+                    self.log('%r generated an exception in %s: %s' % (ticker, res.stage, res.error), logging.ERROR)
+                    continue
+                yield res
+
+    def fetch_ticker_input(self, ticker) -> TickerInput:
+        ticker_input = TickerInput(ticker, self.get_ticker_destination_file(ticker=ticker), self.days, self.show_quote)
+        client = self.clients.acquire(ticker)
+        try:
+            try:
+                ticker_input.quote = self.stat_factory.quotes.get(ticker, client)
+            except Exception as e:
+                # remembered, the statistics that need the quote raise it again
+                ticker_input.quote_error = RuntimeError(f"{type(e).__name__}: {e}")
+            ticker_input.earning_date = self.get_next_earning_date(client)
+        finally:
+            self.stat_factory.quotes.release(ticker)
+            self.clients.release(ticker)
+        return ticker_input
+
+    @staticmethod
+    def accumulate(results) -> pd.DataFrame:
+        data = ColumnAccumulator()
+        for res in results:
+            data.append(res)
+        return data.to_frame()
+
+    def print(self, df: pd.DataFrame, file=None):
         pd.set_option('display.max_columns', None)
         pd.set_option('display.max_rows', None)
-        print(df.sort_values("profit_probability %", ascending=False))
+        if "profit_probability %" in df.columns:
+            df = df.sort_values("profit_probability %", ascending=False, kind="stable",
+                                key=lambda column: column.map(RunningTop.score))
+        print(df, file=file)
         pd.reset_option('display.max_columns')
         pd.reset_option('display.max_rows', None)
 
@@ -70,55 +273,104 @@ class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
         )
 
     def filter_valid_tickers(self, tickers: List[str]):
-        valid_tickers = []
         validation_client = create_client(client_type=Clients.y_finance_validation)
-        for ticker in tickers:
-            destination_dir = self.get_ticker_data_dir(ticker=ticker)
-            destination_file = self.get_ticker_destination_file(ticker=ticker)
-            self.download_if_necessary(ticker, destination_file)
-
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_symbol = {
+                executor.submit(self.validate_ticker, ticker, validation_client): ticker
+                for ticker in tickers
+            }
+        validated = dict()
+        downloaded = dict()
+        for future in concurrent.futures.as_completed(future_to_symbol):
+            ticker = future_to_symbol[future]
             try:
-                self.validate(
-                    ticker=ticker,
-                    client=validation_client,
-                    file=destination_dir,
-                )
-            except Exception as e:
-                self.log(e, logging.ERROR)
+                was_downloaded, is_valid = future.result()
+            except Exception as exc:
+                self.log('%r generated an exception: %s' % (ticker, exc), logging.ERROR)
                 continue
+            if was_downloaded:
+                downloaded[ticker] = self.get_ticker_destination_file(ticker=ticker)
+            validated[ticker] = is_valid
 
-            valid_tickers.append(ticker)
+        self.verdicts.save()
+        self.update_store(downloaded)
+        return [ticker for ticker in tickers if validated.get(ticker, False)]
 
-        return valid_tickers
+    def validate_ticker(self, ticker, validation_client):
+        destination_dir = self.get_ticker_data_dir(ticker=ticker)
+        destination_file = self.get_ticker_destination_file(ticker=ticker)
+        was_downloaded = self.download_if_necessary(ticker, destination_file)
 
-    def calculate_statistics(self, source_file, ticker):
-        data = dict()
-        for statistic in Statistics:
-            statistic_strategy = self.create_statistic(statistic, source_file, ticker)
-            title, stat = statistic_strategy.execute()
-            stats = data.get(title, [])
-            if len(stat.index) > 0:
-                stats.append(stat[stat.index[0]])
-            else:
-                stats.append(None)
-            data[title] = stats
-        return data
+        try:
+            self.validate(
+                ticker=ticker,
+                client=validation_client,
+                file=destination_dir,
+                verdicts=self.verdicts
+            )
+        except Exception as e:
+            self.log(e, logging.ERROR)
+            return was_downloaded, False
+
+        return was_downloaded, True
+
+    def validate_streamed_ticker(self, ticker, validation_client) -> str:
+        """
+        ticker, once validated (and downloaded when missing). raises SkippedTickerException when it is not valid
+        """
+        was_downloaded, is_valid = self.validate_ticker(ticker, validation_client)
+        if was_downloaded:
+            with self.downloaded_lock:
+                self.downloaded[ticker] = self.get_ticker_destination_file(ticker=ticker)
+        if not is_valid:
+            raise SkippedTickerException(ticker)
+        return ticker
+
+    def validate_and_assemble_data(self, ticker, destination_file, validation_client):
+        self.validate_streamed_ticker(ticker, validation_client)
+        return self.assemble_data(ticker, destination_file)
+
+    def prefetch_prices(self, tickers: List[str]):
+        """
+        spot prices for every ticker in a few batched robinhood quote requests, instead of one lookup per ticker
+        """
+        try:
+            prices = self.rh_client.get_latest_prices(tickers)
+        except Exception as e:
+            self.log(f"could not prefetch prices: {e}", logging.ERROR)
+            return
+        self.stat_factory.quotes.set_prices(prices)
+
+    def update_store(self, tickers_to_files):
+        if tickers_to_files and self.store.exists():
+            self.store.write(tickers_to_files)
+
+    def calculate_statistics(self, source_file, ticker, client):
+        return calculate_statistics(self.stat_factory, source_file, ticker, client)
 
     def assemble_data(self, ticker, destination_file):
-        data = self.calculate_statistics(destination_file, ticker)
+        client = self.clients.acquire(ticker)
+        try:
+            data = self.calculate_statistics(destination_file, ticker, client)
+            if self.show_quote:
+                self.add_quote(data, ticker)
 
-        names = data.get("ticker", [])
-        names.append(ticker)
-        data["ticker"] = names
+            names = data.get("ticker", [])
+            names.append(ticker)
+            data["ticker"] = names
 
-        data["earning date"] = self.get_next_earning_date(ticker)
+            data["earning date"] = self.get_next_earning_date(client)
+        finally:
+            self.stat_factory.quotes.release(ticker)
+            self.clients.release(ticker)
         return data
 
-    def get_next_earning_date(self, ticker):
-        client = create_client(
-            client_type=Clients.y_finance,
-            ticker=ticker
-        )
+    def add_quote(self, data, ticker):
+        quote = self.stat_factory.quotes.peek(ticker) or StraddleQuote(None, None, None, None, None)
+        for k, v in quote.as_dict().items():
+            data[k] = [v]
+
+    def get_next_earning_date(self, client):
         return client.get_next_earnings_date()
 
     def submit_fn_to_executor(self, executor, fn, tickers):
@@ -133,8 +385,8 @@ class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
             future_to_symbol[future] = ticker
         return future_to_symbol
 
-    def resolve_futures(self, futures):
-        data = dict()
+    def resolve_futures(self, futures) -> pd.DataFrame:
+        data = ColumnAccumulator()
         for future in concurrent.futures.as_completed(futures):
             res = futures[future]
             try:
@@ -142,10 +394,8 @@ class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
             except Exception as exc:
                 self.log('%r generated an exception: %s' % (res, exc), logging.ERROR)
             else:
-                for k, v in res.items():
-                    stats = data.get(k, [])
-                    data[k] = np.append(stats, v)
-        return data
+                data.append(res)
+        return data.to_frame()
 
     @staticmethod
     def skip_this_ticker(seq):
@@ -158,39 +408,13 @@ class ManyTickerReport(Cmd, ValidatorMixin, LoggingMixin):
     def download_if_necessary(self, ticker, file):
         if not os.path.exists(file):
             self.download(ticker, file)
+            return True
+        return False
 
     def download(self, ticker, file):
+        self.optionslam.download_ticker(ticker, file)
 
-        login_payload = {
-            "username": self.optionslam_username,
-            "password": self.optionslam_password,
-            "next": "/"
-        }
-
-        headers = {
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "same-origin",
-            "Connection": "keep-alive",
-            "Origin": "https://www.optionslam.com",
-            "Host": "www.optionslam.com",
-            "Method": "POST",
-            "Referer": "https://www.optionslam.com/accounts/login/",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/112.0"
-        }
-
-        with Downloader(needs_login=True, login_payload=login_payload,
-                        base_url="https://www.optionslam.com",
-                        download_postfix="/earnings/excel/" + ticker,
-                        login_postfix="/accounts/os_login/",
-                        csrf_attr="csrfmiddlewaretoken",
-                        headers=headers) as d:
-            d.download(file)
-
-    def create_statistic(self, statistic: Statistics, file: str, ticker: str):
-        client = create_client(client_type=Clients.y_finance, ticker=ticker)
+    def create_statistic(self, statistic: Statistics, file: str, ticker: str, client: OptionsClient):
         return self.stat_factory.create(
             stat=statistic,
             file=file,
@@ -1,23 +1,27 @@
+import logging
 import os
 import sys
-from cmd import Cmd
-from clients import *
+from cmds.cmd import Cmd
 from dataframe import *
-from scraper import Downloader
+from optionslam import get_optionslam_downloader
 from strategies.statistics import Statistics
 from strategies.mixins import StatisticFactory
 from clients.mixins import create_client, create_yf_validation_client
 from validators.mixins import ValidatorMixin
+from validators.validators import Validators
 
 __metaclass__ = MethodLoggerMeta
 
+# the data validator needs the earnings csv, which is only there after the download
+PRE_DOWNLOAD_VALIDATORS = tuple(validator for validator in Validators if validator != Validators.data)
+
 
 class TickerReport(Cmd, ValidatorMixin, LoggingMixin):
     def __init__(self, ticker: str, days: int,
                  client_username: str, client_password: str,
                  client_mfa: int, optionslam_username: str,
                  optionslam_password: str, client_type: str,
-                 data_dir: str, *args, **kwargs):
+                 data_dir: str, show_quote: bool = False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ticker = ticker
         self.days = days
@@ -27,6 +31,8 @@ class TickerReport(Cmd, ValidatorMixin, LoggingMixin):
                                     password=client_password, mfa_code=client_mfa, ticker=ticker)
         self.stat_factory = StatisticFactory(days)
         self.data_dir = data_dir
+        self.show_quote = show_quote
+        self.optionslam = get_optionslam_downloader(optionslam_username, optionslam_password)
 
     def get_ticker_data_dir(self):
         return f"{self.data_dir}/{self.ticker}/"
@@ -45,47 +51,26 @@ class TickerReport(Cmd, ValidatorMixin, LoggingMixin):
             self.validate(
                 ticker=self.ticker,
                 client=validation_client,
-                file=destination_file
+                file=destination_file,
+                validator_types=PRE_DOWNLOAD_VALIDATORS
             )
         except Exception as e:
             self.log(e, logging.ERROR)
             sys.exit(1)
 
-        self.download(destination_file)
+        try:
+            self.download(destination_file)
+            self.validate_data(destination_file)
+        except Exception as e:
+            self.log(e, logging.ERROR)
+            sys.exit(1)
 
         df = Dataframe(destination_file, display_cols=["Earning Date", "Max Move"])
 
         self.show_statistics(df, destination_file)
 
     def download(self, file: str):
-
-        login_payload = {
-            "username": self.optionslam_username,
-            "password": self.optionslam_password,
-            "next": "/"
-        }
-
-        headers = {
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "same-origin",
-            "Connection": "keep-alive",
-            "Origin": "https://www.optionslam.com",
-            "Host": "www.optionslam.com",
-            "Method": "POST",
-            "Referer": "https://www.optionslam.com/accounts/login/",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/112.0"
-        }
-
-        with Downloader(needs_login=True, login_payload=login_payload,
-                        base_url="https://www.optionslam.com",
-                        download_postfix="/earnings/excel/" + self.ticker,
-                        login_postfix="/accounts/os_login/",
-                        csrf_attr="csrfmiddlewaretoken",
-                        headers=headers) as d:
-            d.download(file)
+        self.optionslam.download_ticker(self.ticker, file)
 
     def show_statistics(self, df: Dataframe, source_file: str):
         titles = []
@@ -95,6 +80,13 @@ class TickerReport(Cmd, ValidatorMixin, LoggingMixin):
             titles.append(title)
             df[title] = stat
         df.print(titles)
+        if self.show_quote:
+            self.print_quote()
+
+    def print_quote(self):
+        quote = self.stat_factory.quotes.peek(self.ticker)
+        if quote is not None:
+            print(", ".join(f"{k}: {v}" for k, v in quote.as_dict().items()))
 
     def create_statistic(self, statistic: Statistics, file: str):
         return self.stat_factory.create(stat=statistic,
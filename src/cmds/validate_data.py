@@ -0,0 +1,27 @@
+import time
+
+from cmds.cmd import Cmd
+from validators.validators import DataValidator
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+
+class ValidateData(Cmd, LoggingMixin):
+    def __init__(self, data_dir, max_workers=None, quarantine=False, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_dir = data_dir
+        self.max_workers = max_workers
+        self.quarantine = quarantine
+
+    def execute(self):
+        start = time.perf_counter()
+        valid_tickers, invalid = DataValidator.scan(self.data_dir,
+                                                    max_workers=self.max_workers,
+                                                    quarantine=self.quarantine)
+        elapsed = time.perf_counter() - start
+        for ticker, reason in sorted(invalid.items()):
+            print(f"{ticker}: {reason}")
+        action = "quarantined" if self.quarantine else "invalid"
+        print(f"{len(valid_tickers)} valid, {len(invalid)} {action} earnings files in {self.data_dir} ({elapsed:.2f}s)")
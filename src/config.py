@@ -1,6 +1,11 @@
+import os
+
+from argparser import positive_int
 from env import parse_env_var
 
 LOG_CONFIG_FILE = parse_env_var("LOG_CONFIG_FILE")
+# "off" leaves every method unwrapped by MethodLoggerMeta
+METHOD_LOGGING = os.getenv("METHOD_LOGGING", "on")
 
 DEFAULT_REQUIRES_ENV_VAR = True
 
@@ -102,6 +107,41 @@ PARSER_CONFIG = {
         "help": "option to generate a report for earnings within the next 7 days",
         "dest": "do_report"
     },
+    "--show-quote": {
+        "required": False,
+        "action": "store_true",
+        "help": "option to show the expiration, spot price, strike and straddle price behind the straddle predicted move",
+        "dest": "show_quote"
+    },
+    "--stream": {
+        "metavar": "stream format",
+        "type": str,
+        "required": False,
+        "action": "store",
+        "default": None,
+        "help": "with --report, write each row as soon as it is ready as 'text', 'jsonl' or 'csv' lines, "
+                "then the top rows as the final table",
+        "dest": "stream_format",
+        "choices": ["text", "jsonl", "csv"]
+    },
+    "--stream-file": {
+        "metavar": "stream file",
+        "type": str,
+        "required": False,
+        "action": "store",
+        "default": None,
+        "help": "with --stream, file to write the rows to instead of stdout",
+        "dest": "stream_file"
+    },
+    "--top": {
+        "metavar": "top",
+        "type": positive_int,
+        "required": False,
+        "action": "store",
+        "default": 20,
+        "help": "with --stream, number of rows kept in the running ranking and the final table",
+        "dest": "top"
+    },
     "--max-workers": {
         "metavar": "max workers",
         "required": False,
@@ -111,6 +151,31 @@ PARSER_CONFIG = {
         "help": "number of workers generating a report",
         "dest": "max_workers"
     },
+    "--pipeline": {
+        "required": False,
+        "action": "store_true",
+        "help": "with --report, fetch quotes on --max-workers threads and calculate statistics on --cpu-workers "
+                "processes, connected by bounded queues",
+        "dest": "pipeline"
+    },
+    "--cpu-workers": {
+        "metavar": "cpu workers",
+        "required": False,
+        "type": int,
+        "default": None,
+        "action": "store",
+        "help": "with --pipeline, number of processes calculating statistics. defaults to the number of cpus",
+        "dest": "cpu_workers"
+    },
+    "--queue-size": {
+        "metavar": "queue size",
+        "required": False,
+        "type": int,
+        "default": 64,
+        "action": "store",
+        "help": "with --pipeline, number of tickers waiting between two stages before the earlier one blocks",
+        "dest": "queue_size"
+    },
     "--journal": {
         "required": False,
         "action": "store_true",
@@ -148,6 +213,65 @@ PARSER_CONFIG = {
         "help": "option to download all historical earnings data",
         "dest": "do_download"
     },
+    "--sync-ttl": {
+        "metavar": "sync ttl",
+        "type": int,
+        "required": False,
+        "action": "store",
+        "default": 7,
+        "help": "days after which --download-all re-downloads a ticker even without a new earnings event",
+        "dest": "sync_ttl"
+    },
+    "--build-store": {
+        "required": False,
+        "action": "store_true",
+        "help": "option to convert every data/<ticker>/earnings.csv into the columnar earnings store",
+        "dest": "do_build_store"
+    },
+    "--validate-data": {
+        "required": False,
+        "action": "store_true",
+        "help": "option to check every data/<ticker>/earnings.csv is an earnings csv and not html",
+        "dest": "do_validate_data"
+    },
+    "--quarantine": {
+        "required": False,
+        "action": "store_true",
+        "help": "with --validate-data, move invalid files to data/.quarantine/<ticker>/",
+        "dest": "quarantine"
+    },
+    "--backtest": {
+        "required": False,
+        "action": "store_true",
+        "help": "option to backtest long and short straddles over every ticker's earnings history in the data dir",
+        "dest": "do_backtest"
+    },
+    "--implied-moves": {
+        "metavar": "implied moves",
+        "type": float,
+        "required": False,
+        "action": "store",
+        "nargs": "*",
+        "default": None,
+        "help": "with --backtest, the implied moves (in %%) to price straddles at. defaults to 1 to 20",
+        "dest": "implied_moves"
+    },
+    "--backtest-days": {
+        "metavar": "backtest days",
+        "type": int,
+        "required": False,
+        "action": "store",
+        "nargs": "*",
+        "default": None,
+        "help": "with --backtest, the number of latest earnings per ticker to backtest over. defaults to 4 8 12 20 and --days",
+        "dest": "backtest_days"
+    },
+    "--profile-startup": {
+        "required": False,
+        "action": "store_true",
+        "help": "option to print how long startup took, broken down by imported module, before running the command",
+        "dest": "profile_startup"
+    },
     "--data-dir": {
         "metavar": "directory to store data",
         "type": str,
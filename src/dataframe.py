@@ -1,6 +1,8 @@
 import pandas as pd
 from enum import Enum
 
+from cache import frame_cache
+from store import EarningsStore
 from log.mixins import LoggingMixin
 from log.metaclass import MethodLoggerMeta
 
@@ -15,8 +17,7 @@ class PrintStyles(Enum):
 class Dataframe(LoggingMixin):
     def __init__(self, csv_file, display_cols=[], *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.df = self.read_into_df(csv_file)
-        self.convert_to_datetime()
+        self.df = frame_cache.view(csv_file, self.load)
         self.apply_styles()
         self.display_cols = display_cols
 
@@ -30,13 +31,25 @@ class Dataframe(LoggingMixin):
     def shape(self):
         return self.df.shape
 
+    def load(self, csv_file):
+        """
+        the frame_cache loader: builds the frame without touching self.df, which view() assigns
+        """
+        return self.convert_to_datetime(self.read_into_df(csv_file))
+
     def read_into_df(self, csv_file):
+        store = EarningsStore.for_csv(csv_file)
+        if store is not None:
+            df = store.read_csv_slice(csv_file)
+            if df is not None:
+                return df
         df = pd.read_csv(csv_file)
         return df
 
-    def convert_to_datetime(self):
-        self.df["Earning Date"] = pd.to_datetime(self.df["Earning Date"])
-        self.df.sort_values(by='Earning Date', ascending=False, inplace=True)
+    @staticmethod
+    def convert_to_datetime(df):
+        df["Earning Date"] = pd.to_datetime(df["Earning Date"])
+        return df.sort_values(by='Earning Date', ascending=False)
 
     def apply_styles(self):
         styles = self.get_styles()
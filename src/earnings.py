@@ -1,20 +1,21 @@
+from startup import StartupProfile
+
+# installed before anything else is imported so --profile-startup sees every module
+startup_profile = StartupProfile.install_if_requested()
+
 import argparser
-import logging.config
-import yaml
-import os
-
-from cmds.download_all import DownloadAll
-from cmds.journal import JournalBackfill, JournalUpdate
-from cmds.many_ticker_report import ManyTickerReport
-from cmds.ticker_report import TickerReport
+import importlib
+import logging
+import sys
+
 from env import *
 from config import *
+from metrics import metrics
+from log.metaclass import configure_logging
 
 
 def init_logger():
-    with open(os.path.expanduser(LOG_CONFIG_FILE) ,"r") as cfg_file:
-        logging_cfg = yaml.safe_load(cfg_file)
-        logging.config.dictConfig(logging_cfg)
+    configure_logging()
     return logging.getLogger(__name__)
     
 
@@ -44,62 +45,136 @@ def parse_args():
     return create_arg_type(**kwargs)
 
 
-def create_cmd(args):
+class Command(object):
+    """
+    a cli mode: the module and class implementing it, how to build it from the parsed args, and its
+    cold start budget, the ms it may take to import earnings.py plus the command (see benchmarks.startup)
+    """
+
+    def __init__(self, module: str, class_name: str, budget_ms: int, create_args: callable):
+        self.module = module
+        self.class_name = class_name
+        self.budget_ms = budget_ms
+        self.create_args = create_args
+
+    def load(self):
+        return getattr(importlib.import_module(self.module), self.class_name)
+
+    def create(self, args):
+        return self.load()(*self.create_args(args))
+
+
+COMMANDS = {
+    "journal": Command("cmds.journal", "JournalUpdate", 1000, lambda args: (
+        args.journal_file_path,
+        args.rh_username,
+        args.rh_password,
+        args.rh_mfa
+    )),
+    "journal_backfill": Command("cmds.journal", "JournalBackfill", 1000, lambda args: (
+        args.journal_file_path,
+        args.rh_username,
+        args.rh_password,
+        args.rh_mfa
+    )),
+    "build_store": Command("cmds.build_store", "BuildStore", 800, lambda args: (
+        args.data_dir,
+    )),
+    "validate_data": Command("cmds.validate_data", "ValidateData", 800, lambda args: (
+        args.data_dir,
+        args.max_workers,
+        args.quarantine
+    )),
+    "backtest": Command("cmds.backtest", "Backtest", 800, lambda args: (
+        args.data_dir,
+        args.days,
+        args.implied_moves,
+        args.backtest_days,
+        args.max_workers
+    )),
+    "ticker_report": Command("cmds.ticker_report", "TickerReport", 1400, lambda args: (
+        args.tickers[0],
+        args.days,
+        args.rh_username, args.rh_password,
+        args.rh_mfa, args.optionslam_username,
+        args.optionslam_password,
+        args.client,
+        args.data_dir,
+        args.show_quote
+    )),
+    "report": Command("cmds.many_ticker_report", "ManyTickerReport", 1400, lambda args: (
+        args.max_workers,
+        args.tickers,
+        args.days,
+        args.rh_username, args.rh_password,
+        args.rh_mfa, args.optionslam_username,
+        args.optionslam_password,
+        args.data_dir,
+        args.show_quote,
+        args.stream_format,
+        args.stream_file,
+        args.top,
+        args.pipeline,
+        args.cpu_workers,
+        args.queue_size
+    )),
+    "download": Command("cmds.download_all", "DownloadAll", 1200, lambda args: (
+        args.data_dir,
+        args.rh_username,
+        args.rh_password,
+        args.rh_mfa,
+        args.optionslam_username,
+        args.optionslam_password,
+        args.ignore,
+        args.sync_ttl
+    )),
+}
+
+
+def get_mode(args) -> str:
     if args.do_journal:
-        return JournalUpdate(
-            args.journal_file_path,
-            args.rh_username,
-            args.rh_password,
-            args.rh_mfa
-        )
+        return "journal"
     elif args.do_journal_backfill:
-        return JournalBackfill(
-            args.journal_file_path,
-            args.rh_username,
-            args.rh_password,
-            args.rh_mfa
-        )
+        return "journal_backfill"
+    elif args.do_build_store:
+        return "build_store"
+    elif args.do_validate_data:
+        return "validate_data"
+    elif args.do_backtest:
+        return "backtest"
     elif not (args.do_report or args.do_journal or args.do_download):
-        return TickerReport(
-            args.tickers[0], 
-            args.days,
-            args.rh_username, args.rh_password,
-            args.rh_mfa, args.optionslam_username,
-            args.optionslam_password,
-            args.client,
-            args.data_dir
-        )
+        return "ticker_report"
     elif args.do_report:
-        return ManyTickerReport(
-            args.max_workers,
-            args.tickers,
-            args.days,
-            args.rh_username, args.rh_password,
-            args.rh_mfa, args.optionslam_username,
-            args.optionslam_password,
-            args.data_dir
-        )
+        return "report"
     elif args.do_download:
-        return DownloadAll(
-            args.data_dir,
-            args.rh_username,
-            args.rh_password,
-            args.rh_mfa,
-            args.optionslam_username,
-            args.optionslam_password,
-            args.ignore,
-            args.client
-        )
+        return "download"
+
+
+def create_cmd(args):
+    """
+    only the selected command's module, and the client libraries it needs, are imported
+    """
+    return COMMANDS[get_mode(args)].create(args)
 
 
 def main():
-    logger = init_logger()
+    profile = startup_profile or StartupProfile()
+    with profile.phase("init logger"):
+        logger = init_logger()
     logger.info("Initialized logger")
-    args = parse_args()
+    with profile.phase("parse args"):
+        args = parse_args()
     logger.info(f"Parsed args: {vars(args)}")
-    cmd = create_cmd(args)
+    with profile.phase("create cmd"):
+        cmd = create_cmd(args)
+    if startup_profile is not None:
+        startup_profile.uninstall()
+        report = startup_profile.report(budget_ms=COMMANDS[get_mode(args)].budget_ms)
+        logger.info(f"Startup profile:\n{report}")
+        print(report, file=sys.stderr)
     logger.info(f"Executing cmd: {vars(cmd)}")
     cmd.execute()
+    logger.info(f"Metrics: {metrics.snapshot()}")
 
 
 if __name__ == "__main__":
@@ -1,26 +1,57 @@
 from typing import Optional, Tuple
 import yaml
-import logging
+import logging.config
 import abc
 import os
+import threading
 
 from log.mixins import MethodLoggerFactory, MethodLoggers
-from config import LOG_CONFIG_FILE
+from config import LOG_CONFIG_FILE, METHOD_LOGGING
+
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+
+def configure_logging(force: bool = False):
+    """
+    parses LOG_CONFIG_FILE and applies it, once per process unless forced
+    """
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured and not force:
+            return
+        with open(os.path.expanduser(LOG_CONFIG_FILE), "r") as cfg_file:
+            logging_cfg = yaml.safe_load(cfg_file)
+            logging.config.dictConfig(logging_cfg)
+        _logging_configured = True
 
 
 class MethodLoggerMeta(abc.ABCMeta):
+    """
+    wraps every public method in a logger of its args and return value.
+    a class tunes this with
+        __log_exclude__ = {"method", ...}  methods left unwrapped
+        __log_sample__ = 10 or {"method": 10}  log one of every n calls
+    and METHOD_LOGGING=off skips wrapping altogether.
+    """
+
     def __new__(mcs, clsname: str, bases: Tuple[type], attrs: dict):
         mcs.load_logging_config()
         attrs_copy = attrs.copy()
-        factory = MethodLoggerFactory()
-        for key, value in attrs.items():
-            logger_type = mcs.get_logger_type(key=key, obj=value)
-            if logger_type is not None:
+        if mcs.is_enabled():
+            exclude = mcs.get_class_setting("__log_exclude__", bases, attrs) or set()
+            sample = mcs.get_class_setting("__log_sample__", bases, attrs) or 1
+            factory = MethodLoggerFactory()
+            for key, value in attrs.items():
+                logger_type = mcs.get_logger_type(key=key, obj=value)
+                if logger_type is None or key in exclude:
+                    continue
                 logger = mcs.get_logger(obj=value)
                 method_logger = factory.create(
                     method_logger_type=logger_type,
                     logger=logger,
-                    obj=value
+                    obj=value,
+                    sample_every=sample.get(key, 1) if isinstance(sample, dict) else sample
                 )
                 attrs_copy[key] = method_logger
 
@@ -36,6 +67,19 @@ class MethodLoggerMeta(abc.ABCMeta):
 
         return "log", log
 
+    @staticmethod
+    def is_enabled() -> bool:
+        return str(METHOD_LOGGING).lower() not in ("off", "false", "0", "no")
+
+    @staticmethod
+    def get_class_setting(name: str, bases: Tuple[type], attrs: dict):
+        if name in attrs:
+            return attrs[name]
+        for base in bases:
+            if hasattr(base, name):
+                return getattr(base, name)
+        return None
+
     @staticmethod
     def get_logger_type(key: str, obj: object) -> MethodLoggers:
         is_callable = callable(obj)
@@ -49,11 +93,9 @@ class MethodLoggerMeta(abc.ABCMeta):
     @staticmethod
     def get_logger(obj: object):
         logger = logging.getLogger(obj.__module__ + "." + obj.__qualname__)
-        logger.info(f"Initialized logger: {logger.__dict__}")
+        logger.debug("Initialized logger: %s", logger.name)
         return logger
 
     @staticmethod
     def load_logging_config():
-        with open(os.path.expanduser(LOG_CONFIG_FILE), "r") as cfg_file:
-            logging_cfg = yaml.safe_load(cfg_file)
-            logging.config.dictConfig(logging_cfg)
+        configure_logging()
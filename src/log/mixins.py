@@ -1,3 +1,5 @@
+import collections
+import itertools
 import logging
 from enum import Enum
 from typing import Optional
@@ -8,21 +10,72 @@ class MethodLoggers(Enum):
     static = 1
 
 
+# longest repr written for a single argument or return value
+MAX_REPR_LENGTH = 200
+
+
+def summarize(value) -> str:
+    """
+    a short repr: dataframes / series / arrays as their type, shape and dtypes, anything else truncated
+    """
+    shape = getattr(value, "shape", None)
+    if shape is not None and (hasattr(value, "dtypes") or hasattr(value, "dtype")):
+        dtypes = getattr(value, "dtypes", None)
+        if dtypes is None or not hasattr(dtypes, "values"):
+            dtypes = getattr(value, "dtype", dtypes)
+        else:
+            dtypes = dict(collections.Counter(str(dtype) for dtype in dtypes.values))
+        return f"<{type(value).__name__} shape={shape} dtypes={dtypes}>"
+    text = repr(value)
+    if len(text) > MAX_REPR_LENGTH:
+        return f"{text[:MAX_REPR_LENGTH]}...<{len(text)} chars>"
+    return text
+
+
+def summarize_call(args: tuple, kwargs: dict) -> tuple[str, str]:
+    args = "(" + ", ".join(summarize(arg) for arg in args) + ")"
+    kwargs = "{" + ", ".join(f"{key!r}: {summarize(value)}" for key, value in kwargs.items()) + "}"
+    return args, kwargs
+
+
+class Sampler(object):
+    """
+    lets through one of every `every` calls
+    """
+
+    def __init__(self, every: int = 1):
+        self.every = max(int(every), 1)
+        self.calls = itertools.count()
+
+    def __call__(self) -> bool:
+        return self.every == 1 or next(self.calls) % self.every == 0
+
+
 class Loggers:
-    def member_method_logger(method: callable, logger: logging.Logger):
+    def member_method_logger(method: callable, logger: logging.Logger, sample_every: int = 1):
+        sampler = Sampler(sample_every)
+
         def inner(self, *args, **kwargs):
-            logger.info(f"starting | args: {args} | kwargs: {kwargs}")
+            if not (logger.isEnabledFor(logging.INFO) and sampler()):
+                return method(self, *args, **kwargs)
+            call_args, call_kwargs = summarize_call(args, kwargs)
+            logger.info("starting | args: %s | kwargs: %s", call_args, call_kwargs)
             res = method(self, *args, **kwargs)
-            logger.info(f"finished | args: {args} | kwargs: {kwargs} | returns: {res}")
+            logger.info("finished | args: %s | kwargs: %s | returns: %s", call_args, call_kwargs, summarize(res))
             return res
 
         return inner
 
-    def static_method_logger(method: callable, logger: logging.Logger):
+    def static_method_logger(method: callable, logger: logging.Logger, sample_every: int = 1):
+        sampler = Sampler(sample_every)
+
         def inner(self, *args, **kwargs):
-            logger.info(f"Starting | args: {args} | kwargs: {kwargs}")
+            if not (logger.isEnabledFor(logging.INFO) and sampler()):
+                return method(*args, **kwargs)
+            call_args, call_kwargs = summarize_call(args, kwargs)
+            logger.info("Starting | args: %s | kwargs: %s", call_args, call_kwargs)
             res = method(*args, **kwargs)
-            logger.info(f"Finished | args: {args} | kwargs: {kwargs} | returns: {res}")
+            logger.info("Finished | args: %s | kwargs: %s | returns: %s", call_args, call_kwargs, summarize(res))
             return res
 
         return inner
@@ -30,18 +83,21 @@ class Loggers:
 
 class MethodLoggerFactory(object):
 
-    def create(self, method_logger_type: MethodLoggers, logger: logging.Logger, obj: object):
+    def create(self, method_logger_type: MethodLoggers, logger: logging.Logger, obj: object,
+               sample_every: int = 1):
         if method_logger_type == MethodLoggers.member:
             method_logger = Loggers.member_method_logger(
                 method=obj,
-                logger=logger)
-            logger.info(f"Creating MethodLogger: {method_logger}")
+                logger=logger,
+                sample_every=sample_every)
+            logger.debug("Creating MethodLogger: %s", method_logger)
             return method_logger
         if method_logger_type == MethodLoggers.static:
             method_logger = Loggers.static_method_logger(
                 method=obj,
-                logger=logger)
-            logger.info(f"Creating MethodLogger: {method_logger}")
+                logger=logger,
+                sample_every=sample_every)
+            logger.debug("Creating MethodLogger: %s", method_logger)
             return method_logger
 
 
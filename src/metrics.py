@@ -0,0 +1,70 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metric(object):
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def snapshot(self):
+        return {"count": self.count, "total": round(self.total, 6),
+                "mean": round(self.mean, 6), "max": round(self.max, 6)}
+
+
+class Metrics(object):
+    """
+    process-wide, thread-safe counters and timings, e.g. metrics.observe("yfinance.limiter_wait_seconds", 0.4)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = dict()
+
+    def observe(self, name, value):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(name)
+            metric.observe(value)
+
+    def increment(self, name, value=1):
+        self.observe(name, value)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def get(self, name):
+        with self.lock:
+            metric = self.metrics.get(name)
+            return metric.snapshot() if metric is not None else None
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in sorted(self.metrics.items())}
+
+    def reset(self):
+        with self.lock:
+            self.metrics.clear()
+
+
+metrics = Metrics()
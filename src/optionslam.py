@@ -0,0 +1,126 @@
+import os
+import threading
+
+from requests.adapters import HTTPAdapter
+
+from scraper import Downloader
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+BASE_URL = "https://www.optionslam.com"
+LOGIN_POSTFIX = "/accounts/os_login/"
+LOGGED_OUT_POSTFIX = "/accounts/login/"
+EARNINGS_POSTFIX = "/earnings/excel/"
+CSRF_ATTR = "csrfmiddlewaretoken"
+DEFAULT_POOL_SIZE = 32
+
+HEADERS = {
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "same-origin",
+    "Connection": "keep-alive",
+    "Origin": "https://www.optionslam.com",
+    "Host": "www.optionslam.com",
+    "Method": "POST",
+    "Referer": "https://www.optionslam.com/accounts/login/",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/112.0"
+}
+
+
+class DownloadException(Exception):
+    def __init__(self, ticker, status_code):
+        self.ticker = ticker
+        self.status_code = status_code
+        self.message = f"Error: could not download {self.ticker} from optionslam (status {self.status_code})."
+        super().__init__(self.message)
+
+
+class OptionslamDownloader(Downloader):
+    """
+    one logged in optionslam session shared by every download.
+    the csrf token and login are fetched once; after that each ticker costs a single GET
+    over a pooled keep-alive connection. a response that bounces to the login page means the
+    session expired, so the first thread to notice logs in again and the download is retried.
+    """
+
+    def __init__(self, username, password, pool_size=DEFAULT_POOL_SIZE):
+        login_payload = {
+            "username": username,
+            "password": password,
+            "next": "/"
+        }
+        super().__init__(needs_login=True, login_payload=login_payload,
+                         base_url=BASE_URL,
+                         download_postfix=EARNINGS_POSTFIX,
+                         login_postfix=LOGIN_POSTFIX,
+                         csrf_attr=CSRF_ATTR,
+                         headers=HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.login_lock = threading.Lock()
+        self.num_logins = 0
+
+    def earnings_url(self, ticker):
+        return self.download_url + ticker
+
+    def ensure_login(self, expired_login=None):
+        """
+        logs in if nobody has yet, or if the login numbered expired_login is still the current one
+        """
+        with self.login_lock:
+            if self.num_logins == 0 or self.num_logins == expired_login:
+                self.set_csrf()
+                self.login()
+                self.num_logins += 1
+            return self.num_logins
+
+    def is_logged_out(self, response):
+        return response.status_code in (401, 403) or LOGGED_OUT_POSTFIX in response.url
+
+    def fetch_ticker(self, ticker, etag=None, last_modified=None):
+        """
+        etag / last_modified turn the GET into a conditional one, answered with a 304 when nothing changed
+        """
+        headers = dict()
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        current_login = self.ensure_login()
+        response = self.session.get(self.earnings_url(ticker), headers=headers)
+        if self.is_logged_out(response):
+            self.ensure_login(expired_login=current_login)
+            response = self.session.get(self.earnings_url(ticker), headers=headers)
+        return response
+
+    def save(self, content, destination_file):
+        self.ensure_dirs(os.path.dirname(destination_file))
+        self.write(content, destination_file, "wb")
+
+    def check_response(self, ticker, response):
+        """
+        an error or the login page, still there after fetch_ticker logged in again, is not an earnings csv
+        """
+        if response.status_code != 200 or self.is_logged_out(response):
+            raise DownloadException(ticker, response.status_code)
+
+    def download_ticker(self, ticker, destination_file):
+        response = self.fetch_ticker(ticker)
+        self.check_response(ticker, response)
+        self.save(response.content, destination_file)
+
+
+_downloaders = dict()
+_downloaders_lock = threading.Lock()
+
+
+def get_optionslam_downloader(username, password, pool_size=DEFAULT_POOL_SIZE) -> OptionslamDownloader:
+    with _downloaders_lock:
+        downloader = _downloaders.get(username)
+        if downloader is None:
+            downloader = OptionslamDownloader(username=username, password=password, pool_size=pool_size)
+            _downloaders[username] = downloader
+        return downloader
@@ -0,0 +1,307 @@
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+from metrics import metrics
+
+__metaclass__ = MethodLoggerMeta
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_BATCH_SIZE = 8
+# a partly filled batch is sent to the process pool after waiting this long for more items
+BATCH_TIMEOUT_SECONDS = 0.5
+# how often each stage's throughput and queue depth are logged
+MONITOR_INTERVAL_SECONDS = 5.0
+# how often a blocked put / get / acquire checks whether the pipeline was stopped
+STOP_POLL_SECONDS = 0.1
+
+
+class EndOfStream(object):
+    pass
+
+
+END_OF_STREAM = EndOfStream()
+
+
+class StageError(object):
+    """
+    an item a stage failed on. later stages pass it through untouched, so the consumer sees every failure
+    """
+
+    def __init__(self, stage: str, item, error: Exception):
+        self.stage = stage
+        self.item = item
+        self.error = error
+
+    def __repr__(self):
+        return f"StageError(stage={self.stage}, item={self.item!r}, error={self.error!r})"
+
+
+class Stage(LoggingMixin, metaclass=MethodLoggerMeta):
+    """
+    takes items off its bounded inbox and puts results on the next stage's inbox. a full inbox blocks
+    the stage feeding it, so a slow stage holds back the ones before it instead of piling up items
+    """
+    __log_exclude__ = {"run", "work", "submit", "depth", "throughput", "snapshot", "done", "emit", "put", "get",
+                       "acquire"}
+
+    def __init__(self, name: str, workers: int, queue_size: int = DEFAULT_QUEUE_SIZE, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = name
+        self.workers = max(int(workers), 1)
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.outbox = None
+        self.processed = 0
+        self.failed = 0
+        self.started_at = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def start(self, outbox: queue.Queue):
+        self.outbox = outbox
+        self.started_at = time.monotonic()
+
+    def stop(self):
+        """
+        the consumer went away: blocked puts, gets and acquires give up instead of waiting forever
+        """
+        self.stopped.set()
+
+    def put(self, box: queue.Queue, item) -> bool:
+        while not self.stopped.is_set():
+            try:
+                box.put(item, timeout=STOP_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, timeout=None):
+        """
+        the next item off the inbox, None after timeout or once stopped
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.stopped.is_set():
+            wait = STOP_POLL_SECONDS if deadline is None else min(STOP_POLL_SECONDS, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                return self.inbox.get(timeout=wait)
+            except queue.Empty:
+                continue
+        return None
+
+    def emit(self, result):
+        if not self.put(self.outbox, result):
+            return
+        with self.lock:
+            self.processed += 1
+            if isinstance(result, StageError) and result.stage == self.name:
+                self.failed += 1
+
+    def depth(self) -> int:
+        return self.inbox.qsize()
+
+    def throughput(self) -> float:
+        """
+        items per second since the stage started
+        """
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        return {"workers": self.workers, "processed": self.processed, "failed": self.failed,
+                "throughput": round(self.throughput(), 3), "queue_depth": self.depth()}
+
+
+class ThreadStage(Stage):
+    """
+    fn(item) -> result on `workers` threads, for network bound work
+    """
+
+    def __init__(self, name: str, fn, workers: int, queue_size: int = DEFAULT_QUEUE_SIZE, *args, **kwargs):
+        super().__init__(name, workers, queue_size, *args, **kwargs)
+        self.fn = fn
+        self.threads = []
+        self.running = 0
+
+    def start(self, outbox: queue.Queue):
+        super().start(outbox)
+        self.running = self.workers
+        self.threads = [threading.Thread(target=self.run, name=f"{self.name}-{i}", daemon=True)
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self):
+        while not self.stopped.is_set():
+            item = self.get()
+            if item is None:
+                continue
+            if item is END_OF_STREAM:
+                # wake the next worker, the last one out passes the end of stream on
+                self.put(self.inbox, END_OF_STREAM)
+                self.done()
+                return
+            self.emit(self.work(item))
+
+    def work(self, item):
+        if isinstance(item, StageError):
+            return item
+        try:
+            return self.fn(item)
+        except Exception as e:
+            return StageError(self.name, item, e)
+
+    def done(self):
+        with self.lock:
+            self.running -= 1
+            last = self.running == 0
+        if last:
+            self.put(self.outbox, END_OF_STREAM)
+
+
+class ProcessStage(Stage):
+    """
+    fn(items) -> [result per item] on a pool of `workers` processes, for cpu bound work.
+    items are sent in batches of batch_size to amortize pickling; at most 2 batches per process are in flight.
+    fn must be a module level function and items and results must pickle
+    """
+
+    def __init__(self, name: str, fn, workers: int, batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, *args, **kwargs):
+        super().__init__(name, workers, queue_size, *args, **kwargs)
+        self.fn = fn
+        self.batch_size = max(int(batch_size), 1)
+        self.in_flight = threading.BoundedSemaphore(2 * self.workers)
+        self.executor = None
+        self.thread = None
+
+    def start(self, outbox: queue.Queue):
+        super().start(outbox)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        # a forking pool starts all its processes on the first submit: do that now, before other threads
+        # are running and might hold a lock the children would inherit
+        self.executor.submit(int).result()
+        self.thread = threading.Thread(target=self.run, name=f"{self.name}-feeder", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        super().stop()
+        # pending batches are dropped; the pool's result thread must not wait on a consumer that is gone
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        batch = []
+        try:
+            while not self.stopped.is_set():
+                item = self.get(timeout=BATCH_TIMEOUT_SECONDS)
+                if item is END_OF_STREAM:
+                    break
+                if isinstance(item, StageError):
+                    self.emit(item)
+                elif item is not None:
+                    batch.append(item)
+                if batch and (item is None or len(batch) >= self.batch_size):
+                    self.submit(batch)
+                    batch = []
+            if batch:
+                self.submit(batch)
+            # every batch has been emitted once all of its in flight slots are back
+            for _ in range(2 * self.workers):
+                if not self.acquire():
+                    break
+        finally:
+            self.executor.shutdown(wait=not self.stopped.is_set(), cancel_futures=self.stopped.is_set())
+            self.put(self.outbox, END_OF_STREAM)
+
+    def acquire(self) -> bool:
+        while not self.stopped.is_set():
+            if self.in_flight.acquire(timeout=STOP_POLL_SECONDS):
+                return True
+        return False
+
+    def submit(self, batch: list):
+        if not self.acquire():
+            return
+        try:
+            future = self.executor.submit(self.fn, batch)
+        except Exception as e:
+            self.in_flight.release()
+            for item in batch:
+                self.emit(StageError(self.name, item, e))
+            return
+        future.add_done_callback(lambda f: self.work(batch, f))
+
+    def work(self, batch: list, future):
+        try:
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [StageError(self.name, item, e) for item in batch]
+            for result in results:
+                self.emit(result)
+        finally:
+            self.in_flight.release()
+
+
+class Pipeline(LoggingMixin, metaclass=MethodLoggerMeta):
+    """
+    stages connected by their bounded inboxes. results() feeds items to the first stage and yields
+    what comes out of the last one, in completion order, logging each stage's throughput and queue depth
+    every MONITOR_INTERVAL_SECONDS. closing results() early (an exception in the consumer, a broken pipe,
+    Ctrl-C) stops every stage, so no thread is left blocked and the process can exit
+    """
+    __log_exclude__ = {"feed", "monitor", "log_stages"}
+
+    def __init__(self, name: str, stages: list, queue_size: int = DEFAULT_QUEUE_SIZE, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = name
+        self.stages = stages
+        self.output = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+
+    def results(self, items):
+        outboxes = [stage.inbox for stage in self.stages[1:]] + [self.output]
+        # last stage first, so every stage has somewhere to put its results and process pools fork early
+        for stage, outbox in reversed(list(zip(self.stages, outboxes))):
+            stage.start(outbox)
+        feeder = threading.Thread(target=self.feed, args=(items,), name=f"{self.name}-feed", daemon=True)
+        monitor = threading.Thread(target=self.monitor, name=f"{self.name}-monitor", daemon=True)
+        feeder.start()
+        monitor.start()
+        try:
+            while True:
+                result = self.output.get()
+                if result is END_OF_STREAM:
+                    return
+                yield result
+        finally:
+            self.stopped.set()
+            for stage in self.stages:
+                stage.stop()
+            self.log_stages()
+
+    def feed(self, items):
+        first = self.stages[0]
+        for item in items:
+            if not first.put(first.inbox, item):
+                return
+        first.put(first.inbox, END_OF_STREAM)
+
+    def monitor(self):
+        while not self.stopped.wait(MONITOR_INTERVAL_SECONDS):
+            self.log_stages()
+
+    def log_stages(self):
+        for stage in self.stages:
+            snapshot = stage.snapshot()
+            metrics.observe(f"pipeline.{self.name}.{stage.name}.queue_depth", snapshot["queue_depth"])
+            self.log(f"{self.name} | {stage.name} | {snapshot}", logging.INFO)
@@ -0,0 +1,127 @@
+import csv
+import heapq
+import itertools
+import json
+import math
+import sys
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOP = 20
+RANK_BY = "profit_probability %"
+LEADING_COLUMNS = ("ticker", "earning date")
+
+
+class StreamFormats(Enum):
+    text = 0
+    jsonl = 1
+    csv = 2
+
+
+class RunningTop(object):
+    """
+    the top rows by one column, in O(top) memory however many rows go by
+    """
+
+    def __init__(self, top: int, rank_by: str):
+        if top < 1:
+            raise ValueError(f"top must be at least 1, got {top}")
+        self.top = top
+        self.rank_by = rank_by
+        self.heap = []
+        self.counter = itertools.count()
+
+    @staticmethod
+    def score(value) -> float:
+        """
+        the number to rank by: profit probabilities are strings like "45.5% (5/11)"
+        """
+        if isinstance(value, str):
+            value = value.split("%", 1)[0]
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return -math.inf
+        return -math.inf if math.isnan(value) else value
+
+    def add(self, row: dict):
+        # earlier rows win ties, so a later row needs a strictly higher score to displace one
+        entry = (self.score(row.get(self.rank_by)), -next(self.counter), row)
+        if len(self.heap) < self.top:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def rank(self, row: dict):
+        """
+        1-based position of row in the current top, or None
+        """
+        for position, (_, _, ranked) in enumerate(sorted(self.heap, key=lambda entry: entry[:2], reverse=True)):
+            if ranked is row:
+                return position + 1
+        return None
+
+    def rows(self) -> list:
+        return [row for _, _, row in sorted(self.heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+class ReportStream(object):
+    """
+    writes each ManyTickerReport row as soon as it is ready, as text, jsonl or csv lines, while keeping
+    a running top ranking. close() returns the final table: the top rows, sorted
+    """
+
+    def __init__(self, stream_format: StreamFormats, out=None, top: int = DEFAULT_TOP, rank_by: str = RANK_BY):
+        self.stream_format = stream_format
+        self.out = out or sys.stdout
+        self.ranking = RunningTop(top, rank_by)
+        self.csv_writer = None
+        self.num_rows = 0
+
+    @staticmethod
+    def flatten(res: dict) -> dict:
+        """
+        {column: [value]} as produced by assemble_data -> {column: value}, ticker and earning date first
+        """
+        row = dict()
+        for name in LEADING_COLUMNS + tuple(res):
+            if name in res and name not in row:
+                value = res[name]
+                if isinstance(value, (list, tuple)):
+                    value = value[0] if value else None
+                row[name] = value
+        return row
+
+    @staticmethod
+    def to_json(value):
+        """
+        a missing statistic (NaN, inf, NaT) as null, json has no NaN; numpy scalars as their python value
+        """
+        if value is pd.NaT or (isinstance(value, (float, np.floating)) and not math.isfinite(value)):
+            return None
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def write(self, res: dict):
+        row = self.flatten(res)
+        self.ranking.add(row)
+        self.num_rows += 1
+        if self.stream_format == StreamFormats.jsonl:
+            row = {name: self.to_json(value) for name, value in row.items()}
+            self.out.write(json.dumps(row, default=str, allow_nan=False) + "\n")
+        elif self.stream_format == StreamFormats.csv:
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.out, fieldnames=list(row), extrasaction="ignore")
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow(row)
+        else:
+            rank = self.ranking.rank(row)
+            ranked = f" | #{rank} of top {self.ranking.top}" if rank is not None else ""
+            self.out.write(" | ".join(f"{name}: {value}" for name, value in row.items()) + ranked + "\n")
+        self.out.flush()
+
+    def close(self) -> pd.DataFrame:
+        return pd.DataFrame(self.ranking.rows())
@@ -0,0 +1,80 @@
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+PROFILE_STARTUP_FLAG = "--profile-startup"
+DEFAULT_TOP_MODULES = 25
+
+
+class StartupProfile(object):
+    """
+    cold start breakdown: time spent importing each module (self and cumulative, like python -X importtime)
+    and in each named startup phase, e.g. with profile.phase("parse args"): ...
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.imports = dict()
+        self.phases = dict()
+        self.stack = []
+        self.original_import = None
+
+    @classmethod
+    def install_if_requested(cls, argv=None):
+        if PROFILE_STARTUP_FLAG not in (argv if argv is not None else sys.argv):
+            return None
+        return cls().install()
+
+    def install(self):
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+        return self
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self.stack.append(0.0)
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.stack.pop()
+            if self.stack:
+                self.stack[-1] += elapsed
+            self.imports[name] = (elapsed - children, elapsed)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def import_seconds(self):
+        """
+        total time spent importing, since self times never overlap
+        """
+        return sum(self_seconds for self_seconds, _ in self.imports.values())
+
+    def report(self, top=DEFAULT_TOP_MODULES, budget_ms=None) -> str:
+        total = time.perf_counter() - self.started_at
+        lines = [f"startup: {total * 1000:.1f} ms total, "
+                 f"{self.import_seconds() * 1000:.1f} ms importing {len(self.imports)} modules"]
+        if budget_ms is not None:
+            verdict = "over" if total * 1000 > budget_ms else "within"
+            lines.append(f"  {verdict} the {budget_ms} ms cold start budget")
+        for name, seconds in self.phases.items():
+            lines.append(f"  phase {name:<24} {seconds * 1000:>9.1f} ms")
+        lines.append(f"  {'module':<40} {'self ms':>9} {'cumulative ms':>14}")
+        by_cumulative = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (self_seconds, cumulative_seconds) in by_cumulative[:top]:
+            lines.append(f"  {name:<40} {self_seconds * 1000:>9.1f} {cumulative_seconds * 1000:>14.1f}")
+        return "\n".join(lines)
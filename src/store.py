@@ -0,0 +1,276 @@
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+STORE_DIR_NAME = ".earnings_store"
+EARNINGS_FILE_NAME = "earnings.csv"
+EARNINGS_HEADER_PREFIX = "Symbol,Earning Date"
+DATE_COL = "Earning Date"
+
+FLOAT_KIND = "f"
+DATE_KIND = "M"
+STRING_KIND = "U"
+
+
+class Partition(object):
+    """
+    one .npz file holding the earnings rows of every ticker whose symbol starts with the same character.
+    rows are grouped by ticker (sorted by symbol) and sorted by Earning Date within a ticker,
+    so a ticker's rows are the slice offsets[i]:offsets[i + 1] of every column.
+    """
+
+    def __init__(self, columns, kinds, symbols, offsets, mtimes, arrays, nulls):
+        self.columns = columns
+        self.kinds = kinds
+        self.symbols = symbols
+        self.offsets = offsets
+        self.mtimes = mtimes
+        self.arrays = arrays
+        self.nulls = nulls
+        self._df = None
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], np.array([], dtype=str), np.zeros(1, dtype=np.int64),
+                   np.array([], dtype=np.float64), [], [])
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file, allow_pickle=False) as npz:
+            columns = npz["columns"].tolist()
+            kinds = npz["kinds"].tolist()
+            arrays = [npz[f"c{i}"] for i in range(len(columns))]
+            nulls = [npz[f"n{i}"] if kind == STRING_KIND else None
+                     for i, kind in enumerate(kinds)]
+            return cls(columns, kinds, npz["symbols"], npz["offsets"], npz["mtimes"], arrays, nulls)
+
+    def save(self, file):
+        members = {
+            "columns": np.array(self.columns, dtype=str),
+            "kinds": np.array(self.kinds, dtype=str),
+            "symbols": self.symbols,
+            "offsets": self.offsets,
+            "mtimes": self.mtimes,
+        }
+        for i, array in enumerate(self.arrays):
+            members[f"c{i}"] = array
+            if self.nulls[i] is not None:
+                members[f"n{i}"] = self.nulls[i]
+        tmp_file = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.savez(f, **members)
+        os.replace(tmp_file, file)
+
+    def find(self, ticker) -> Optional[int]:
+        i = int(np.searchsorted(self.symbols, ticker))
+        if i < len(self.symbols) and self.symbols[i] == ticker:
+            return i
+        return None
+
+    def mtime(self, ticker) -> Optional[float]:
+        i = self.find(ticker)
+        if i is None:
+            return None
+        return float(self.mtimes[i])
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            data = {}
+            for column, kind, array, null in zip(self.columns, self.kinds, self.arrays, self.nulls):
+                if kind == STRING_KIND:
+                    array = array.astype(object)
+                    array[null] = np.nan
+                data[column] = array
+            self._df = pd.DataFrame(data, columns=self.columns)
+        return self._df
+
+    def frame(self, ticker) -> Optional[pd.DataFrame]:
+        i = self.find(ticker)
+        if i is None:
+            return None
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.df.iloc[start:stop].reset_index(drop=True)
+
+    def frames(self) -> dict:
+        return {
+            ticker: (self.frame(ticker), float(mtime))
+            for ticker, mtime in zip(self.symbols.tolist(), self.mtimes)
+        }
+
+    @classmethod
+    def from_frames(cls, frames: dict):
+        """
+        frames: {ticker: (DataFrame, source mtime)}
+        """
+        symbols = sorted(frames)
+        lengths = [len(frames[symbol][0]) for symbol in symbols]
+        offsets = np.zeros(len(symbols) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        mtimes = np.array([frames[symbol][1] for symbol in symbols], dtype=np.float64)
+
+        non_empty = [frames[symbol][0] for symbol, length in zip(symbols, lengths) if length > 0]
+        if not non_empty:
+            partition = cls.empty()
+            partition.symbols = np.array(symbols, dtype=str)
+            partition.offsets = offsets
+            partition.mtimes = mtimes
+            return partition
+
+        df = pd.concat(non_empty, ignore_index=True)
+        columns, kinds, arrays, nulls = [], [], [], []
+        for column in df.columns:
+            kind, array, null = cls.encode(column, df[column])
+            columns.append(column)
+            kinds.append(kind)
+            arrays.append(array)
+            nulls.append(null)
+        return cls(columns, kinds, np.array(symbols, dtype=str), offsets, mtimes, arrays, nulls)
+
+    @staticmethod
+    def encode(column, series):
+        if column == DATE_COL:
+            return DATE_KIND, pd.to_datetime(series).values.astype("datetime64[ns]"), None
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return FLOAT_KIND, series.to_numpy(dtype=np.float64), None
+        null = series.isna().values
+        return STRING_KIND, series.fillna("").astype(str).values.astype(str), null
+
+
+class EarningsStore(LoggingMixin):
+    """
+    consolidated, columnar copy of the data/<TICKER>/earnings.csv tree.
+    it lives in data/.earnings_store/ and is only used once it has been built with --build-store.
+    """
+
+    _partitions = dict()
+    _partitions_lock = threading.Lock()
+    _write_lock = threading.Lock()
+
+    def __init__(self, data_dir, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_dir = data_dir
+        self.store_dir = os.path.join(data_dir, STORE_DIR_NAME)
+
+    @classmethod
+    def for_csv(cls, csv_file):
+        data_dir = os.path.dirname(os.path.dirname(os.path.abspath(csv_file)))
+        store = cls(data_dir)
+        if store.exists():
+            return store
+        return None
+
+    @staticmethod
+    def ticker_from_csv(csv_file):
+        return os.path.basename(os.path.dirname(os.path.abspath(csv_file)))
+
+    @staticmethod
+    def is_earnings_csv(csv_file):
+        try:
+            with open(csv_file, "r") as f:
+                return f.readline().startswith(EARNINGS_HEADER_PREFIX)
+        except (OSError, UnicodeDecodeError):
+            return False
+
+    def exists(self):
+        return os.path.isdir(self.store_dir)
+
+    def get_ticker_destination_file(self, ticker):
+        return os.path.join(self.data_dir, ticker, EARNINGS_FILE_NAME)
+
+    @staticmethod
+    def partition_name(ticker):
+        first = ticker[:1].upper()
+        if first.isalnum():
+            return first
+        return "_"
+
+    def partition_file(self, name):
+        return os.path.join(self.store_dir, f"{name}.npz")
+
+    def get_partition(self, name) -> Partition:
+        file = self.partition_file(name)
+        try:
+            mtime = os.stat(file).st_mtime_ns
+        except FileNotFoundError:
+            return Partition.empty()
+        with self._partitions_lock:
+            cached = self._partitions.get(file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        partition = Partition.load(file)
+        with self._partitions_lock:
+            self._partitions[file] = (mtime, partition)
+        return partition
+
+    def read(self, ticker) -> Optional[pd.DataFrame]:
+        partition = self.get_partition(self.partition_name(ticker))
+        return partition.frame(ticker)
+
+    def read_csv_slice(self, csv_file) -> Optional[pd.DataFrame]:
+        """
+        returns the stored rows for csv_file's ticker, or None when the csv was rewritten after it was stored
+        """
+        ticker = self.ticker_from_csv(csv_file)
+        partition = self.get_partition(self.partition_name(ticker))
+        stored_mtime = partition.mtime(ticker)
+        if stored_mtime is None:
+            return None
+        try:
+            if os.stat(csv_file).st_mtime > stored_mtime:
+                return None
+        except FileNotFoundError:
+            pass
+        return partition.frame(ticker)
+
+    def write(self, tickers_to_files: dict):
+        """
+        tickers_to_files: {ticker: earnings.csv}. files that are not earnings csvs (e.g. html) are skipped.
+        """
+        by_partition = dict()
+        for ticker, csv_file in tickers_to_files.items():
+            if not self.is_earnings_csv(csv_file):
+                continue
+            by_partition.setdefault(self.partition_name(ticker), dict())[ticker] = csv_file
+
+        with self._write_lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            for name, files in by_partition.items():
+                frames = self.get_partition(name).frames()
+                for ticker, csv_file in files.items():
+                    frames[ticker] = self.read_csv(csv_file)
+                Partition.from_frames(frames).save(self.partition_file(name))
+        return sum(len(files) for files in by_partition.values())
+
+    @staticmethod
+    def read_csv(csv_file):
+        mtime = os.stat(csv_file).st_mtime
+        df = pd.read_csv(csv_file)
+        df[DATE_COL] = pd.to_datetime(df[DATE_COL])
+        df.sort_values(by=DATE_COL, kind="stable", inplace=True, ignore_index=True)
+        return df, mtime
+
+    def list_csv_files(self):
+        res = dict()
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.name == STORE_DIR_NAME or not entry.is_dir():
+                    continue
+                csv_file = os.path.join(entry.path, EARNINGS_FILE_NAME)
+                if os.path.isfile(csv_file):
+                    res[entry.name] = csv_file
+        return res
+
+    def convert(self):
+        """
+        one-shot conversion of the whole data/ tree into the store
+        """
+        return self.write(self.list_csv_files())
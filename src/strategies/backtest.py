@@ -0,0 +1,169 @@
+import concurrent.futures
+import os
+
+import numpy as np
+import pandas as pd
+
+from store import EarningsStore, DATE_COL
+
+MAX_MOVE_COL = "Max Move"
+FINAL_MOVE_COL = "Final Move"
+# hypothetical implied moves, in % of the stock price
+DEFAULT_IMPLIED_MOVES = tuple(float(move) for move in range(1, 21))
+# --days windows: the latest n earnings of every ticker
+DEFAULT_WINDOWS = (4, 8, 12, 20)
+
+
+class EventTable(object):
+    """
+    every historical earnings event of a universe as flat arrays. events are grouped by ticker
+    (tickers[i] owns lengths[i] consecutive events), oldest first within a ticker
+    """
+
+    def __init__(self, tickers: np.ndarray, lengths: np.ndarray, dates: np.ndarray,
+                 max_moves: np.ndarray, final_moves: np.ndarray):
+        self.tickers = tickers
+        self.lengths = lengths
+        self.dates = dates
+        self.max_moves = max_moves
+        self.final_moves = final_moves
+        self.ticker_codes = np.repeat(np.arange(len(tickers)), lengths)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        # 0 for a ticker's latest event, 1 for the one before, ...
+        self.recency = (lengths[self.ticker_codes] - 1) - (np.arange(len(self.ticker_codes)) - offsets[self.ticker_codes])
+
+    def __len__(self):
+        return len(self.ticker_codes)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.array([], dtype=str), np.zeros(0, dtype=np.int64), np.array([], dtype="datetime64[ns]"),
+                   np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def concat(cls, tables: list):
+        tables = [table for table in tables if len(table.tickers)]
+        if not tables:
+            return cls.empty()
+        return cls(np.concatenate([table.tickers for table in tables]),
+                   np.concatenate([table.lengths for table in tables]),
+                   np.concatenate([table.dates for table in tables]),
+                   np.concatenate([table.max_moves for table in tables]),
+                   np.concatenate([table.final_moves for table in tables]))
+
+    @classmethod
+    def from_partition(cls, partition, tickers: set):
+        """
+        the events of the given tickers in an earnings store partition, sliced straight from its arrays
+        """
+        if not len(partition.symbols) or MAX_MOVE_COL not in partition.columns:
+            return cls.empty()
+        keep = np.isin(partition.symbols, list(tickers))
+        lengths = np.diff(partition.offsets)
+        rows = np.repeat(keep, lengths)
+        column = partition.columns.index
+        return cls(partition.symbols[keep], lengths[keep],
+                   partition.arrays[column(DATE_COL)][rows],
+                   partition.arrays[column(MAX_MOVE_COL)][rows].astype(np.float64),
+                   partition.arrays[column(FINAL_MOVE_COL)][rows].astype(np.float64))
+
+    @classmethod
+    def from_frames(cls, frames: dict):
+        """
+        frames: {ticker: DataFrame sorted by Earning Date}
+        """
+        frames = {ticker: df for ticker, df in frames.items() if len(df) and MAX_MOVE_COL in df.columns}
+        if not frames:
+            return cls.empty()
+        tickers = sorted(frames)
+        return cls(np.array(tickers, dtype=str),
+                   np.array([len(frames[ticker]) for ticker in tickers], dtype=np.int64),
+                   np.concatenate([frames[ticker][DATE_COL].to_numpy(dtype="datetime64[ns]") for ticker in tickers]),
+                   np.concatenate([pd.to_numeric(frames[ticker][MAX_MOVE_COL], errors="coerce").to_numpy(np.float64)
+                                   for ticker in tickers]),
+                   np.concatenate([pd.to_numeric(frames[ticker][FINAL_MOVE_COL], errors="coerce").to_numpy(np.float64)
+                                   for ticker in tickers]))
+
+    @classmethod
+    def load(cls, data_dir, max_workers=None):
+        """
+        the whole data/ universe: from the earnings store where it is up to date,
+        the remaining earnings csvs are parsed in parallel
+        """
+        store = EarningsStore(data_dir)
+        files = {ticker: file for ticker, file in store.list_csv_files().items() if store.is_earnings_csv(file)}
+        tables, stored = [], set()
+        if store.exists():
+            by_partition = dict()
+            for ticker in files:
+                by_partition.setdefault(store.partition_name(ticker), set()).add(ticker)
+            for name, tickers in by_partition.items():
+                partition = store.get_partition(name)
+                fresh = {ticker for ticker in tickers if cls.is_fresh(partition, ticker, files[ticker])}
+                tables.append(cls.from_partition(partition, fresh))
+                stored |= fresh
+        missing = sorted(set(files) - stored)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = dict(zip(missing, executor.map(lambda ticker: store.read_csv(files[ticker])[0], missing)))
+        tables.append(cls.from_frames(frames))
+        return cls.concat(tables)
+
+    @staticmethod
+    def is_fresh(partition, ticker, csv_file) -> bool:
+        stored_mtime = partition.mtime(ticker)
+        return stored_mtime is not None and os.stat(csv_file).st_mtime <= stored_mtime
+
+
+def backtest_straddles(events: EventTable, implied_moves, windows) -> pd.DataFrame:
+    """
+    for every (window, implied move): how a straddle priced at that implied move did over each ticker's
+    latest `window` earnings, across the whole universe at once.
+    a long straddle wins when the stock closed the day after earnings further than the implied move
+    (|Final Move| > move), its p&l is |Final Move| - move in % of the stock price; a short straddle is the reverse.
+    "max move beat %" is ProfitProbability's measure: |Max Move| > move. events missing a move are skipped
+    """
+    moves = np.asarray(sorted(implied_moves), dtype=np.float64)
+    max_moves = np.abs(events.max_moves)
+    final_moves = np.abs(events.final_moves)
+    is_valid = ~(np.isnan(max_moves) | np.isnan(final_moves))
+    num_tickers = len(events.tickers)
+
+    rows = []
+    for window in sorted(set(windows)):
+        selected = is_valid & (events.recency < window)
+        window_max_moves = max_moves[selected]
+        window_final_moves = final_moves[selected]
+        codes = events.ticker_codes[selected]
+        num_events = len(codes)
+        ticker_events = np.bincount(codes, minlength=num_tickers)
+        has_events = ticker_events > 0
+
+        # events x moves
+        max_move_beat = window_max_moves[:, None] > moves[None, :]
+        long_wins = window_final_moves[:, None] > moves[None, :]
+        short_wins = window_final_moves[:, None] < moves[None, :]
+        # per ticker ProfitProbability for every move in one bincount over (ticker, move) cells
+        cells = (codes[:, None] * len(moves) + np.arange(len(moves))[None, :]).ravel()
+        ticker_beats = np.bincount(cells, weights=max_move_beat.ravel(),
+                                   minlength=num_tickers * len(moves)).reshape(num_tickers, len(moves))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ticker_probabilities = ticker_beats[has_events] / ticker_events[has_events, None] * 100
+            mean_final_move = window_final_moves.mean() if num_events else np.nan
+            long_pnl = mean_final_move - moves
+            to_percent = 100 / num_events if num_events else np.nan
+
+        for i, move in enumerate(moves):
+            rows.append({
+                "days": window,
+                "implied move %": move,
+                "tickers": int(has_events.sum()),
+                "events": num_events,
+                "max move beat %": max_move_beat[:, i].sum() * to_percent,
+                "median ticker profit_probability %": np.median(ticker_probabilities[:, i])
+                if len(ticker_probabilities) else np.nan,
+                "long win %": long_wins[:, i].sum() * to_percent,
+                "short win %": short_wins[:, i].sum() * to_percent,
+                "long p&l %": long_pnl[i],
+                "short p&l %": -long_pnl[i],
+            })
+    return pd.DataFrame(rows).round(2)
@@ -3,12 +3,14 @@ from strategies.statistics import ClosePercent, \
     StraddlePredictedMovement, ProfitProbability, \
     Statistics, Statistic
 
+from strategies.quote import QuoteContext
 from clients.client import OptionsClient
 
 
 class StatisticFactory(object):
-    def __init__(self, days: int):
+    def __init__(self, days: int, quotes: QuoteContext = None):
         self.days = days
+        self.quotes = quotes or QuoteContext()
 
     def create(self, stat: Statistics, file: str, ticker: str, client: OptionsClient) -> Statistic:
         if stat ==  Statistics.close_percent:
@@ -35,6 +37,7 @@ class StatisticFactory(object):
                 csv_file=file,
                 client=client,
                 ticker=ticker,
+                quotes=self.quotes,
                 days=self.days
             )
         if stat ==  Statistics.profit_probability:
@@ -43,5 +46,6 @@ class StatisticFactory(object):
                 csv_file=file,
                 client=client,
                 ticker=ticker,
+                quotes=self.quotes,
                 days=self.days
             )
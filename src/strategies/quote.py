@@ -0,0 +1,64 @@
+import threading
+from typing import Optional
+
+from clients.client import OptionsClient, StraddleQuote
+
+
+class QuoteContext(object):
+    """
+    run scoped straddle quotes: the implied move, spot price, expiration and strike
+    are computed once per ticker and shared by every statistic that needs them.
+    a failed quote is remembered too, so its error is raised again instead of re-fetched.
+    spot prices fetched up front in one batch (see set_prices) are handed to the client instead of looked up per ticker.
+    """
+
+    def __init__(self):
+        self.quotes = dict()
+        self.prices = dict()
+        self.lock = threading.Lock()
+        self.ticker_locks = dict()
+
+    def get(self, ticker: str, client: OptionsClient) -> Optional[StraddleQuote]:
+        with self.lock:
+            ticker_lock = self.ticker_locks.setdefault(ticker, threading.Lock())
+        with ticker_lock:
+            if ticker not in self.quotes:
+                try:
+                    quote = client.get_straddle_quote(ticker, latest_price=self.prices.get(ticker))
+                    self.quotes[ticker] = (quote, None)
+                except Exception as err:
+                    self.quotes[ticker] = (None, err)
+            quote, err = self.quotes[ticker]
+        if err is not None:
+            raise err
+        return quote
+
+    def seed(self, ticker: str, quote: Optional[StraddleQuote], err: Optional[Exception] = None):
+        """
+        a quote (or the error getting it) fetched elsewhere, e.g. in another process
+        """
+        with self.lock:
+            self.quotes[ticker] = (quote, err)
+
+    def set_prices(self, prices: dict):
+        with self.lock:
+            self.prices.update(prices)
+
+    def peek(self, ticker: str) -> Optional[StraddleQuote]:
+        """
+        the already computed quote for ticker, if any
+        """
+        quote, _ = self.quotes.get(ticker, (None, None))
+        return quote
+
+    def get_straddle_predicted_movement(self, ticker: str, client: OptionsClient) -> Optional[float]:
+        quote = self.get(ticker, client)
+        if quote is None:
+            return None
+        return quote.straddle_predicted_movement
+
+    def release(self, ticker: str):
+        with self.lock:
+            self.quotes.pop(ticker, None)
+            self.prices.pop(ticker, None)
+            self.ticker_locks.pop(ticker, None)
@@ -0,0 +1,191 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+
+
+def window_bounds(num_values: int, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    the i-th window is values[i:i + window], clipped to the end of values, for i in range(window)
+    """
+    starts = np.arange(window, dtype=np.int64)
+    ends = np.minimum(starts + window, num_values)
+    return starts, ends
+
+
+def rolling_means(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    NaN skipping mean of every window, from prefix sums
+    """
+    starts, ends = window_bounds(len(values), window)
+    is_valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(is_valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(is_valid)))
+    window_sums = sums[ends] - sums[starts]
+    window_counts = counts[ends] - counts[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+def rolling_medians(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    NaN skipping median of every window. windows only ever slide right or shrink from the left,
+    so a SlidingMedian is updated with one add and one remove per window
+    """
+    starts, ends = window_bounds(len(values), window)
+    medians = np.empty(window, dtype=np.float64)
+    sliding_median = SlidingMedian()
+    end = 0
+    for i, (start, stop) in enumerate(zip(starts, ends)):
+        while end < stop:
+            sliding_median.add(values[end])
+            end += 1
+        if start > 0:
+            sliding_median.remove(values[start - 1])
+        medians[i] = sliding_median.median()
+    return medians
+
+
+# cells of the (windows x longest window) matrix sorted at once by batch_rolling_medians
+MEDIAN_CHUNK_CELLS = 1 << 22
+
+
+def batch_window_bounds(lengths: np.ndarray, days: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    the windows of many tickers laid end to end over their concatenated values: [starts, ends) of every
+    window, and the offsets splitting the windows back into tickers
+    """
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    windows = np.array([num_days_to_calculate(length, days) for length in lengths], dtype=np.int64)
+
+    # ticker of every output row and that row's position inside the ticker's windows
+    ticker_of_row = np.repeat(np.arange(len(lengths)), windows)
+    row_offsets = np.concatenate(([0], np.cumsum(windows)))
+    position = np.arange(row_offsets[-1]) - row_offsets[ticker_of_row]
+    starts = offsets[ticker_of_row] + position
+    ends = offsets[ticker_of_row] + np.minimum(position + windows[ticker_of_row], lengths[ticker_of_row])
+    return starts, ends, row_offsets
+
+
+def batch_rolling_means(arrays: list[np.ndarray], days: int) -> list[np.ndarray]:
+    """
+    rolling_means for many tickers in one pass over their concatenated values
+    """
+    lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+    if not len(arrays) or not lengths.sum():
+        return [np.empty(0) for _ in arrays]
+    values = np.concatenate(arrays).astype(np.float64)
+    starts, ends, row_offsets = batch_window_bounds(lengths, days)
+
+    is_valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(is_valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(is_valid)))
+    window_sums = sums[ends] - sums[starts]
+    window_counts = counts[ends] - counts[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(window_counts > 0, window_sums / window_counts, np.nan)
+    return np.split(means, row_offsets[1:-1])
+
+
+def batch_rolling_medians(arrays: list[np.ndarray], days: int) -> list[np.ndarray]:
+    """
+    rolling_medians for many tickers over their concatenated values: every window is gathered into a row of
+    a NaN padded matrix, rows are sorted (NaNs last) and the median is read at each row's middle valid value.
+    rows are processed MEDIAN_CHUNK_CELLS at a time to bound memory
+    """
+    lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+    if not len(arrays) or not lengths.sum():
+        return [np.empty(0) for _ in arrays]
+    values = np.append(np.concatenate(arrays).astype(np.float64), np.nan)
+    padding = len(values) - 1
+    starts, ends, row_offsets = batch_window_bounds(lengths, days)
+    sizes = ends - starts
+
+    medians = np.empty(len(starts), dtype=np.float64)
+    rows_per_chunk = max(MEDIAN_CHUNK_CELLS // max(int(sizes.max(initial=1)), 1), 1)
+    for first in range(0, len(starts), rows_per_chunk):
+        chunk = slice(first, first + rows_per_chunk)
+        width = int(sizes[chunk].max(initial=0))
+        if not width:
+            medians[chunk] = np.nan
+            continue
+        cells = starts[chunk, None] + np.arange(width)[None, :]
+        # cells past a window's end point at the trailing NaN
+        cells = np.where(cells < ends[chunk, None], cells, padding)
+        windows = np.sort(values[cells], axis=1)
+        num_valid = (~np.isnan(windows)).sum(axis=1)
+        low = np.take_along_axis(windows, np.maximum(num_valid - 1, 0)[:, None] // 2, axis=1)[:, 0]
+        high = np.take_along_axis(windows, (num_valid // 2)[:, None], axis=1)[:, 0]
+        medians[chunk] = np.where(num_valid > 0, (low + high) / 2, np.nan)
+    return np.split(medians, row_offsets[1:-1])
+
+
+def num_days_to_calculate(num_earnings: int, days: int) -> int:
+    if days >= num_earnings:
+        return num_earnings
+    return num_earnings - days
+
+
+class SlidingMedian(object):
+    """
+    two heaps (max-heap of the low half, min-heap of the high half) with lazy deletion.
+    NaNs are ignored, matching pd.Series.median
+    """
+
+    def __init__(self):
+        self.low = []
+        self.high = []
+        self.low_size = 0
+        self.high_size = 0
+        self.delayed = defaultdict(int)
+
+    def add(self, value):
+        if np.isnan(value):
+            return
+        if not self.low or value <= -self.low[0]:
+            heapq.heappush(self.low, -value)
+            self.low_size += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.high_size += 1
+        self.balance()
+
+    def remove(self, value):
+        if np.isnan(value):
+            return
+        self.delayed[value] += 1
+        if self.low and value <= -self.low[0]:
+            self.low_size -= 1
+            if value == -self.low[0]:
+                self.prune(self.low, -1)
+        else:
+            self.high_size -= 1
+            if self.high and value == self.high[0]:
+                self.prune(self.high, 1)
+        self.balance()
+
+    def median(self):
+        if self.low_size == 0:
+            return np.nan
+        if self.low_size > self.high_size:
+            return -self.low[0]
+        return (-self.low[0] + self.high[0]) / 2
+
+    def balance(self):
+        if self.low_size > self.high_size + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.low_size -= 1
+            self.high_size += 1
+            self.prune(self.low, -1)
+        elif self.low_size < self.high_size:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.low_size += 1
+            self.high_size -= 1
+            self.prune(self.high, 1)
+
+    def prune(self, heap, sign):
+        while heap and self.delayed.get(sign * heap[0], 0):
+            value = sign * heapq.heappop(heap)
+            self.delayed[value] -= 1
+            if not self.delayed[value]:
+                del self.delayed[value]
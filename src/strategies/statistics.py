@@ -3,6 +3,7 @@ from enum import Enum
 
 from dataframe import Dataframe
 from strategies.strategy import Strategy
+from strategies.rolling import rolling_means, rolling_medians, num_days_to_calculate
 from log.metaclass import MethodLoggerMeta
 
 __metaclass__ = MethodLoggerMeta
@@ -17,16 +18,15 @@ class Statistics(Enum):
 
 
 class Statistic(Dataframe, metaclass=MethodLoggerMeta):
+    __log_exclude__ = {"num_days_to_calculate", "get_window_length", "get_index", "num_earnings"}
+
     def __init__(self, stat_name, csv_file, days, *args, **kwargs):
         super().__init__(csv_file=csv_file, *args, **kwargs)
         self.stat_name = stat_name
         self.days = days
 
     def num_days_to_calculate(self) -> int:
-        num_earnings = self.num_earnings
-        if self.days >= num_earnings:
-            return num_earnings
-        return num_earnings - self.days
+        return num_days_to_calculate(self.num_earnings, self.days)
 
     def get_window_length(self) -> int:
         if self.days >= self.num_earnings:
@@ -43,12 +43,16 @@ class Statistic(Dataframe, metaclass=MethodLoggerMeta):
     def num_earnings(self) -> int:
         return self.df.shape[0]
 
+    def get_abs_max_moves(self):
+        return self.df["Max Move"].abs().to_numpy(dtype=float)
+
 
 class RhStatistic(Statistic):
-    def __init__(self, stat_name, csv_file, client, ticker, *args, **kwargs):
+    def __init__(self, stat_name, csv_file, client, ticker, quotes, *args, **kwargs):
         super().__init__(stat_name=stat_name, csv_file=csv_file, *args, **kwargs)
         self.ticker = ticker
         self.client = client
+        self.quotes = quotes
 
 
 class ClosePercent(Statistic, Strategy):
@@ -81,12 +85,8 @@ class MaxMeanMovement(Statistic, Strategy):
         return f"n day {self.stat_name} %"
 
     def calculate_historical_max_mean_movement(self):
-        historical_max_means = []
         days_to_calculate = self.num_days_to_calculate()
-
-        for i in range(0, days_to_calculate):
-            window = self.df["Max Move"].iloc[i:days_to_calculate + i].abs()
-            historical_max_means.append(window.mean())
+        historical_max_means = rolling_means(self.get_abs_max_moves(), days_to_calculate)
 
         idx = self.get_index()
         return self.title, pd.Series(historical_max_means, index=idx)
@@ -106,12 +106,8 @@ class MaxMedianMovement(Statistic, Strategy):
         return f"n day {self.stat_name} %"
 
     def calculate_historical_max_median_movement(self):
-        historical_max_medians = []
         days_to_calculate = self.num_days_to_calculate()
-
-        for i in range(0, days_to_calculate):
-            window = self.df["Max Move"].iloc[i:days_to_calculate + i].abs()
-            historical_max_medians.append(window.median())
+        historical_max_medians = rolling_medians(self.get_abs_max_moves(), days_to_calculate)
 
         idx = self.get_index()
         return self.title, pd.Series(historical_max_medians, index=idx)
@@ -120,7 +116,7 @@ class MaxMedianMovement(Statistic, Strategy):
 class StraddlePredictedMovement(RhStatistic, Strategy):
 
     def execute(self):
-        straddle_predicted_movement = self.client.get_straddle_predicted_movement()
+        straddle_predicted_movement = self.quotes.get_straddle_predicted_movement(self.ticker, self.client)
         return self.title, pd.Series(straddle_predicted_movement, index=[self.df.shape[0] - 1])
 
     @property
@@ -150,7 +146,7 @@ class ProfitProbability(RhStatistic, Strategy):
 
     def get_straddle_predicted_movement(self):
         window_length = self.get_window_length()
-        straddle_predicted_movement = self.client.get_straddle_predicted_movement()
+        straddle_predicted_movement = self.quotes.get_straddle_predicted_movement(self.ticker, self.client)
         straddle_predicted_movement = pd.Series(straddle_predicted_movement for _ in range(window_length))
         return straddle_predicted_movement
 
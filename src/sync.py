@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Optional
+
+import pandas as pd
+
+from store import EarningsStore, DATE_COL
+from log.mixins import LoggingMixin
+from log.metaclass import MethodLoggerMeta
+
+__metaclass__ = MethodLoggerMeta
+
+MANIFEST_FILE_NAME = ".sync_manifest.json"
+DEFAULT_TTL_DAYS = 7
+# optionslam publishes an earnings row a few days after the event, so a ticker
+# that is due but still has no new row is retried at most once a day
+RETRY_INTERVAL = timedelta(days=1)
+DEFAULT_EARNINGS_CADENCE = timedelta(days=91)
+
+
+class SyncStatus(Enum):
+    fetched = 0
+    skipped = 1
+    unchanged = 2
+
+
+class SyncManifest(LoggingMixin):
+    """
+    per ticker: when it was last downloaded, the last Earning Date in the file,
+    a sha256 of the content and the ETag / Last-Modified validators optionslam sent.
+    """
+
+    def __init__(self, data_dir, ttl_days=DEFAULT_TTL_DAYS, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_dir = data_dir
+        self.file = os.path.join(data_dir, MANIFEST_FILE_NAME)
+        self.ttl = timedelta(days=ttl_days)
+        self.entries = self.load()
+
+    def load(self) -> dict:
+        try:
+            with open(self.file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return dict()
+
+    def save(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp_file = f"{self.file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.file)
+
+    def get(self, ticker, csv_file) -> dict:
+        entry = self.entries.get(ticker)
+        if entry is None and os.path.isfile(csv_file):
+            entry = self.entry_from_file(csv_file)
+            self.entries[ticker] = entry
+        return entry
+
+    def entry_from_file(self, csv_file) -> dict:
+        with open(csv_file, "rb") as f:
+            content = f.read()
+        last_earning_date, cadence = self.read_earning_dates(csv_file)
+        return {
+            "downloaded_at": datetime.fromtimestamp(os.stat(csv_file).st_mtime).isoformat(),
+            "last_earning_date": last_earning_date,
+            "cadence_days": cadence,
+            "sha256": self.hash(content),
+            "etag": None,
+            "last_modified": None,
+        }
+
+    @staticmethod
+    def hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def read_earning_dates(csv_file) -> tuple[Optional[str], Optional[int]]:
+        """
+        last Earning Date in the file and the median number of days between earnings
+        """
+        if not EarningsStore.is_earnings_csv(csv_file):
+            return None, None
+        earning_dates = pd.to_datetime(pd.read_csv(csv_file, usecols=[DATE_COL])[DATE_COL]).sort_values()
+        if earning_dates.empty:
+            return None, None
+        cadence = None
+        if len(earning_dates) > 1:
+            cadence = int(earning_dates.diff().dt.days.median())
+        return earning_dates.iloc[-1].date().isoformat(), cadence
+
+    def is_due(self, ticker, csv_file, now=None) -> bool:
+        """
+        a ticker is due when it has never been downloaded, its csv is gone (e.g. quarantined), its ttl expired,
+        or an earnings event (last Earning Date + the ticker's usual cadence) has happened since its last download
+        """
+        now = now or datetime.now()
+        if not os.path.isfile(csv_file):
+            return True
+        entry = self.get(ticker, csv_file)
+        if entry is None:
+            return True
+        downloaded_at = datetime.fromisoformat(entry["downloaded_at"])
+        if now - downloaded_at >= self.ttl:
+            return True
+        if entry["last_earning_date"] is None:
+            return False
+        cadence = timedelta(days=entry["cadence_days"]) if entry["cadence_days"] else DEFAULT_EARNINGS_CADENCE
+        expected_earning_date = date.fromisoformat(entry["last_earning_date"]) + cadence
+        return expected_earning_date <= now.date() and now - downloaded_at >= RETRY_INTERVAL
+
+    def validators(self, ticker, csv_file=None) -> dict:
+        # a csv that is gone has to be fetched in full, not revalidated
+        entry = self.entries.get(ticker) if csv_file is None or os.path.isfile(csv_file) else None
+        entry = entry or dict()
+        return {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+
+    def is_unchanged(self, ticker, content: bytes, csv_file=None) -> bool:
+        entry = self.entries.get(ticker)
+        if csv_file is not None and not os.path.isfile(csv_file):
+            return False
+        return entry is not None and entry["sha256"] == self.hash(content)
+
+    def record(self, ticker, csv_file, etag=None, last_modified=None, content: Optional[bytes] = None):
+        entry = self.entries.get(ticker) or dict()
+        entry["downloaded_at"] = datetime.now().isoformat()
+        entry["etag"] = etag or entry.get("etag")
+        entry["last_modified"] = last_modified or entry.get("last_modified")
+        if content is not None:
+            entry["sha256"] = self.hash(content)
+            entry["last_earning_date"], entry["cadence_days"] = self.read_earning_dates(csv_file)
+        self.entries[ticker] = entry
@@ -0,0 +1,186 @@
+"""
+usage (from src/):
+    python -m unittest discover -s tests
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+if not os.getenv("LOG_CONFIG_FILE"):
+    _log_config = tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False)
+    _log_config.write("version: 1\ndisable_existing_loggers: False\n")
+    _log_config.close()
+    os.environ["LOG_CONFIG_FILE"] = _log_config.name
+os.environ.setdefault("METHOD_LOGGING", "off")
+
+import pandas as pd  # noqa: E402
+
+from clients.robinhood import OPTION_ORDER_COLUMNS  # noqa: E402
+from cmds.journal import JournalUpdate  # noqa: E402
+from trades import match_trades  # noqa: E402
+
+
+def leg(symbol, expiration_date, strike_price, option_type, side, created_at, direction, quantity, price,
+        opening_strategy=None, closing_strategy=None):
+    return {
+        "chain_symbol": symbol,
+        "expiration_date": expiration_date,
+        "strike_price": strike_price,
+        "option_type": option_type,
+        "side": side,
+        "order_created_at": created_at,
+        "direction": direction,
+        "order_quantity": quantity,
+        "order_type": "limit",
+        "opening_strategy": opening_strategy,
+        "closing_strategy": closing_strategy,
+        "price": price,
+        "processed_quantity": quantity,
+    }
+
+
+def straddle(symbol, expiration_date, strike_price, side, created_at, direction, quantity, price, **strategies):
+    return [leg(symbol, expiration_date, strike_price, option_type, side, created_at, direction, quantity, price,
+                **strategies)
+            for option_type in ("call", "put")]
+
+
+OPEN_AAPL = straddle("AAPL", "2026-01-16", 150.0, "buy", "2026-01-02T15:00:00Z", "debit", 2.0, 5.0,
+                     opening_strategy="long_straddle")
+CLOSE_AAPL = straddle("AAPL", "2026-01-16", 150.0, "sell", "2026-01-05T15:00:00Z", "credit", 1.0, 7.0,
+                      closing_strategy="long_straddle")
+OPEN_MSFT = [leg("MSFT", "2026-02-20", 300.0, "put", "sell", "2026-01-03T15:00:00Z", "credit", 1.0, 2.0,
+                 opening_strategy="short_put")]
+CLOSE_MSFT = [leg("MSFT", "2026-02-20", 300.0, "put", "buy", "2026-01-04T15:00:00Z", "debit", 1.0, 0.5,
+                  closing_strategy="short_put")]
+
+
+class MatchTradesTest(unittest.TestCase):
+    def match(self, legs, as_of):
+        trades = match_trades(pd.DataFrame(legs, columns=OPTION_ORDER_COLUMNS), as_of=as_of)
+        return {row["chain_symbol"]: row for row in trades.to_dict("records")}
+
+    def test_partly_closed_trade_realizes_the_closed_contracts(self):
+        trade = self.match(OPEN_AAPL + CLOSE_AAPL, as_of="2026-01-06")["AAPL"]
+
+        self.assertEqual(trade["status"], "open")
+        self.assertEqual(trade["strikes"], "150.0C 150.0P")
+        self.assertEqual(trade["closed_contracts"], 1.0)
+        # half of the 2 x 500 debit against the 700 credit
+        self.assertEqual(trade["profit"], 200.0)
+
+    def test_closed_trade(self):
+        trade = self.match(OPEN_MSFT + CLOSE_MSFT, as_of="2026-01-06")["MSFT"]
+
+        self.assertEqual(trade["status"], "closed")
+        self.assertEqual(trade["closing_strategy"], "short_put")
+        self.assertEqual(trade["profit"], 150.0)
+
+    def test_open_contracts_past_expiration_expire_worthless(self):
+        trade = self.match(OPEN_AAPL + CLOSE_AAPL, as_of="2026-01-17")["AAPL"]
+
+        self.assertEqual(trade["status"], "expired")
+        self.assertEqual(trade["profit"], -300.0)
+
+
+class StubClient(object):
+    """
+    get_filled_option_legs over a fixed list of (updated_at, rows) orders
+    """
+
+    def __init__(self):
+        self.orders = []
+        self.calls = []
+
+    def add(self, updated_at, rows):
+        self.orders.append((updated_at, rows))
+
+    def get_filled_option_legs(self, updated_after=None):
+        self.calls.append(updated_after)
+        after = pd.Timestamp(updated_after) if updated_after else None
+        orders = [(updated_at, rows) for updated_at, rows in self.orders
+                  if after is None or pd.Timestamp(updated_at) >= after]
+        high_water_mark = max((updated_at for updated_at, _ in orders), key=pd.Timestamp, default=updated_after)
+        orders.sort(key=lambda order: order[1][0]["order_created_at"])
+        return [row for _, rows in orders for row in rows], high_water_mark
+
+
+class JournalUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.client = StubClient()
+        self.journal = JournalUpdate.__new__(JournalUpdate)
+        self.journal.abs_file_path = os.path.join(self.dir.name, "journal.csv")
+        self.journal.client = self.client
+
+    def execute(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.journal.execute()
+
+    def journal_rows(self):
+        return pd.read_csv(self.journal.abs_file_path)
+
+    def trades(self):
+        return pd.read_csv(self.journal.trades_file).set_index("chain_symbol")
+
+    def test_state_file_round_trip(self):
+        self.client.add("2026-01-02T15:00:01Z", OPEN_AAPL)
+        self.client.add("2026-01-05T15:00:01Z", CLOSE_AAPL)
+        self.execute()
+
+        with open(self.journal.state_file) as f:
+            state = json.load(f)
+        self.assertEqual(state["high_water_mark"], "2026-01-05T15:00:01Z")
+        self.assertEqual(state["journal"], self.journal.journal_stat())
+        self.assertEqual(self.journal.get_high_water_mark(), "2026-01-05T15:00:01Z")
+
+        # the order at the mark comes back and is not journaled twice
+        self.execute()
+        self.assertEqual(self.client.calls[-1], "2026-01-05T15:00:01Z")
+        self.assertEqual(len(self.journal_rows()), 4)
+
+    def test_order_filled_after_a_newer_order_is_journaled(self):
+        self.client.add("2026-01-02T15:00:01Z", OPEN_AAPL)
+        self.client.add("2026-01-05T15:00:01Z", CLOSE_AAPL)
+        self.execute()
+
+        # created before the newest journaled order, filled after it
+        self.client.add("2026-01-07T10:00:00Z", OPEN_MSFT)
+        self.execute()
+
+        self.assertEqual(sorted(self.journal_rows()["chain_symbol"]), ["AAPL"] * 4 + ["MSFT"])
+        self.assertEqual(self.journal.get_high_water_mark(), "2026-01-07T10:00:00Z")
+
+    def test_journal_changed_behind_our_back_falls_back_to_order_created_at(self):
+        self.client.add("2026-01-02T15:00:01Z", OPEN_AAPL)
+        self.execute()
+        os.utime(self.journal.abs_file_path, ns=(0, 0))
+
+        self.assertEqual(self.journal.get_high_water_mark(), "2026-01-02T15:00:00+00:00")
+        self.execute()
+        self.assertEqual(len(self.journal_rows()), 2)
+
+    def test_expired_open_trade_is_matched_again_without_new_orders(self):
+        self.client.add("2026-01-02T15:00:01Z", OPEN_AAPL)
+        self.client.add("2026-01-05T15:00:01Z", CLOSE_AAPL)
+        self.execute()
+        trades = self.trades()
+        # as if journal_trades.csv was written before the 2026-01-16 expiration
+        trades.loc["AAPL", "status"] = "open"
+        trades.reset_index().to_csv(self.journal.trades_file, index=False)
+
+        self.execute()
+
+        self.assertEqual(self.trades().loc["AAPL", "status"], "expired")
+
+
+if __name__ == "__main__":
+    unittest.main()
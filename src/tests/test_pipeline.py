@@ -0,0 +1,104 @@
+"""
+usage (from src/):
+    python -m unittest discover -s tests
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+if not os.getenv("LOG_CONFIG_FILE"):
+    _log_config = tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False)
+    _log_config.write("version: 1\ndisable_existing_loggers: False\n")
+    _log_config.close()
+    os.environ["LOG_CONFIG_FILE"] = _log_config.name
+os.environ.setdefault("METHOD_LOGGING", "off")
+
+from pipeline import Pipeline, ThreadStage, ProcessStage  # noqa: E402
+
+# generous: a pipeline that stops as it should exits in well under a second
+EXIT_TIMEOUT_SECONDS = 30
+
+# a two stage pipeline whose consumer raises on the first result, in a process of its own
+# so a thread left blocked shows up as a process that never exits
+EARLY_EXIT_SCRIPT = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, {tests_dir!r})
+    from test_pipeline import Pipeline, ThreadStage, ProcessStage, double, square_all
+
+    pipeline = Pipeline("test", [
+        ThreadStage("double", double, workers=4, queue_size=2),
+        ProcessStage("square", square_all, workers=2, batch_size=2, queue_size=2),
+    ], queue_size=2)
+    for result in pipeline.results(range(10000)):
+        if {consumer_raises}:
+            raise RuntimeError("consumer failed on " + repr(result))
+""")
+
+
+def double(item):
+    return 2 * item
+
+
+def square_all(items):
+    return [item * item for item in items]
+
+
+def create_pipeline():
+    return Pipeline("test", [
+        ThreadStage("double", double, workers=4, queue_size=2),
+        ProcessStage("square", square_all, workers=2, batch_size=2, queue_size=2),
+    ], queue_size=2)
+
+
+class PipelineTest(unittest.TestCase):
+    def run_script(self, consumer_raises: bool):
+        """
+        a subprocess.TimeoutExpired here means the process hung on exit
+        """
+        script = EARLY_EXIT_SCRIPT.format(tests_dir=os.path.dirname(os.path.abspath(__file__)),
+                                          consumer_raises=consumer_raises)
+        start = time.monotonic()
+        process = subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR, capture_output=True, text=True,
+                                 timeout=EXIT_TIMEOUT_SECONDS)
+        return process, time.monotonic() - start
+
+    def test_results_in_completion_order_cover_every_item(self):
+        results = list(create_pipeline().results(range(100)))
+        self.assertEqual(sorted(results), [(2 * item) ** 2 for item in range(100)])
+
+    def test_process_exits_when_the_consumer_raises(self):
+        process, elapsed = self.run_script(consumer_raises=True)
+
+        self.assertEqual(process.returncode, 1, process.stderr)
+        self.assertIn("consumer failed", process.stderr)
+        self.assertLess(elapsed, EXIT_TIMEOUT_SECONDS)
+
+    def test_process_exits_when_the_consumer_finishes(self):
+        process, _ = self.run_script(consumer_raises=False)
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+    def test_closing_results_early_stops_every_stage(self):
+        pipeline = create_pipeline()
+        results = pipeline.results(range(10000))
+        next(results)
+
+        results.close()
+
+        self.assertTrue(all(stage.stopped.is_set() for stage in pipeline.stages))
+        for stage in pipeline.stages:
+            for thread in getattr(stage, "threads", []) + [getattr(stage, "thread", None)]:
+                if thread is not None:
+                    thread.join(timeout=EXIT_TIMEOUT_SECONDS)
+                    self.assertFalse(thread.is_alive(), thread.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
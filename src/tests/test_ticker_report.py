@@ -0,0 +1,81 @@
+"""
+usage (from src/):
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+if not os.getenv("LOG_CONFIG_FILE"):
+    _log_config = tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False)
+    _log_config.write("version: 1\ndisable_existing_loggers: False\n")
+    _log_config.close()
+    os.environ["LOG_CONFIG_FILE"] = _log_config.name
+os.environ.setdefault("METHOD_LOGGING", "off")
+
+from cmds.ticker_report import TickerReport  # noqa: E402
+
+EARNINGS_CSV = b"Symbol,Earning Date,Max Move\nAAPL,2026-01-29,3.1\n"
+LOGIN_PAGE = b"<!DOCTYPE html><html><body>login</body></html>"
+
+
+class ValidClient(object):
+    def exists(self, ticker):
+        return True
+
+    def supports_options(self, ticker):
+        return True
+
+    def has_future_earnings_dates(self, ticker):
+        return True
+
+
+def write_download(content):
+    def download(file):
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        with open(file, "wb") as f:
+            f.write(content)
+
+    return mock.Mock(side_effect=download)
+
+
+class TickerReportFirstRunTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.data_dir.cleanup)
+        self.report = TickerReport.__new__(TickerReport)
+        self.report.ticker = "AAPL"
+        self.report.data_dir = self.data_dir.name
+        self.report.show_statistics = mock.Mock()
+        patcher = mock.patch("cmds.ticker_report.create_yf_validation_client", return_value=ValidClient())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_downloads_before_validating_data_in_an_empty_data_dir(self):
+        self.report.download = write_download(EARNINGS_CSV)
+
+        self.report.execute()
+
+        destination_file = self.report.get_ticker_destination_file()
+        self.report.download.assert_called_once_with(destination_file)
+        self.report.show_statistics.assert_called_once()
+        with open(destination_file, "rb") as f:
+            self.assertEqual(f.read(), EARNINGS_CSV)
+
+    def test_exits_when_the_download_is_not_an_earnings_csv(self):
+        self.report.download = write_download(LOGIN_PAGE)
+
+        with self.assertRaises(SystemExit) as exited:
+            self.report.execute()
+
+        self.assertEqual(exited.exception.code, 1)
+        self.report.show_statistics.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
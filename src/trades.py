@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# one option contract, a leg opens or closes a position in it
+CONTRACT_KEY = ["chain_symbol", "expiration_date", "strike_price", "option_type"]
+# no two orders on the same symbol are created at the same time
+ORDER_KEY = ["chain_symbol", "order_created_at"]
+CONTRACT_MULTIPLIER = 100
+
+TRADE_COLUMNS = ["chain_symbol", "opening_strategy", "opened_at", "expiration_date", "strikes", "direction",
+                 "contracts", "premium_open", "closing_strategy", "closed_at", "closed_contracts", "premium_close",
+                 "profit", "status"]
+
+
+def prepare_legs(legs: pd.DataFrame) -> pd.DataFrame:
+    """
+    journal.csv rows (one per order leg) in execution order, with an order_id, a contract_id, and how much
+    of each leg closes an existing position in its contract (closing) or opens a new one (opening)
+    """
+    legs = legs.copy()
+    legs["order_created_at"] = pd.to_datetime(legs["order_created_at"], utc=True)
+    legs["expiration_date"] = pd.to_datetime(legs["expiration_date"])
+    legs = legs.sort_values(by="order_created_at", kind="stable", ignore_index=True)
+    legs["order_id"] = legs.groupby(ORDER_KEY, sort=False).ngroup()
+    legs["contract_id"] = legs.groupby(CONTRACT_KEY, sort=False).ngroup()
+
+    quantity = legs["processed_quantity"].fillna(legs["order_quantity"]).to_numpy(dtype=np.float64)
+    signed = np.where(legs["side"].to_numpy() == "buy", quantity, -quantity)
+    position_after = pd.Series(signed).groupby(legs["contract_id"]).cumsum().to_numpy()
+    position_before = position_after - signed
+    # the part of a leg trading against the current position closes it, anything beyond that opens a new one
+    closes_position = np.sign(position_before) == -np.sign(signed)
+    legs["quantity"] = quantity
+    legs["closing"] = np.where(closes_position, np.minimum(quantity, np.abs(position_before)), 0.0)
+    legs["opening"] = quantity - legs["closing"]
+    # cash per contract of the whole order: price is the order's net premium
+    sign = np.where(legs["direction"].to_numpy() == "credit", 1.0, -1.0)
+    legs["cash"] = legs["price"].to_numpy(dtype=np.float64) * CONTRACT_MULTIPLIER * sign
+    return legs
+
+
+def fifo_intervals(legs: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    every leg with some `column` quantity as the interval [start, end) of its contract's running total
+    """
+    intervals = legs.loc[legs[column] > 0, ["contract_id", "order_id", column]]
+    intervals = intervals.rename(columns={column: "quantity"})
+    intervals["end"] = intervals.groupby("contract_id")["quantity"].cumsum()
+    intervals["start"] = intervals["end"] - intervals["quantity"]
+    return intervals
+
+
+def match_legs(legs: pd.DataFrame) -> pd.DataFrame:
+    """
+    pairs opening and closing quantities contract by contract, first in first out.
+    the n-th contract closed is the n-th contract opened, so both sides are laid out on their contract's
+    running total and cut at every interval end; an as-of join finds the open and close leg covering each piece.
+    returns [open_order_id, close_order_id, matched] with matched in leg contracts
+    """
+    opens = fifo_intervals(legs, "opening")
+    closes = fifo_intervals(legs, "closing")
+    cuts = pd.concat([opens[["contract_id", "end"]], closes[["contract_id", "end"]]], ignore_index=True)
+    cuts = cuts.drop_duplicates().sort_values(["contract_id", "end"], ignore_index=True)
+    cuts["start"] = cuts.groupby("contract_id")["end"].shift(fill_value=0.0)
+    cuts = cuts.sort_values("end", kind="stable", ignore_index=True)
+
+    # the interval covering each piece is the first one ending at or after the piece's end
+    for name, intervals in (("open", opens), ("close", closes)):
+        intervals = intervals[["contract_id", "end", "start", "order_id"]].sort_values("end", kind="stable")
+        intervals = intervals.rename(columns={"start": f"{name}_start", "order_id": f"{name}_order_id"})
+        cuts = pd.merge_asof(cuts, intervals, on="end", by="contract_id", direction="forward")
+    pieces = cuts
+    # a piece beyond one side's total is still open (or closes a position opened before the journal starts)
+    is_matched = (pieces["open_start"] <= pieces["start"]) & (pieces["close_start"] <= pieces["start"])
+    pieces = pieces[is_matched]
+    pieces = pieces.assign(matched=pieces["end"] - pieces["start"])
+    pieces = pieces.astype({"open_order_id": np.int64, "close_order_id": np.int64})
+    return pieces.groupby(["open_order_id", "close_order_id"], as_index=False)["matched"].sum()
+
+
+def match_trades(legs: pd.DataFrame, as_of=None) -> pd.DataFrame:
+    """
+    one row per opening order with what closed it, from the legs of journal.csv in one pass.
+    profit is realized on the closed contracts: the opening premium's share plus the closing orders' premium
+    allocated by matched contracts. contracts left open past their expiration count as expired worthless
+    """
+    legs = prepare_legs(legs)
+    matches = match_legs(legs)
+    as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+
+    legs["strike"] = legs["strike_price"].astype(str) + legs["option_type"].str[:1].str.upper()
+    order_groups = legs.groupby("order_id", sort=False)
+    orders = order_groups.agg(chain_symbol=("chain_symbol", "first"),
+                              created_at=("order_created_at", "first"),
+                              opening_strategy=("opening_strategy", "first"),
+                              closing_strategy=("closing_strategy", "first"),
+                              direction=("direction", "first"),
+                              price=("price", "first"),
+                              contracts=("quantity", "first"),
+                              cash=("cash", "first"),
+                              opening=("opening", "sum"),
+                              legs=("quantity", "size"))
+    # a trade is described by its opening legs, a roll's closing legs belong to the trade it closes
+    opening_legs = legs[legs["opening"] > 0].groupby("order_id", sort=False)
+    orders["expiration_date"] = opening_legs["expiration_date"].min()
+    orders["strikes"] = opening_legs["strike"].agg(" ".join)
+    # leg contracts per order contract
+    orders["leg_contracts"] = orders["contracts"] * orders["legs"]
+
+    closing_orders = orders.loc[matches["close_order_id"]].reset_index(drop=True)
+    matches["close_cash"] = closing_orders["cash"] * closing_orders["contracts"] \
+        * matches["matched"] / closing_orders["leg_contracts"]
+    matches["close_price"] = closing_orders["price"]
+    matches["closed_at"] = closing_orders["created_at"]
+    matches["closing_strategy"] = closing_orders["closing_strategy"]
+    matches = matches.sort_values("closed_at", kind="stable")
+    closed = matches.groupby("open_order_id").agg(matched=("matched", "sum"),
+                                                  close_cash=("close_cash", "sum"),
+                                                  closed_at=("closed_at", "last"),
+                                                  last_closing_strategy=("closing_strategy", "last"))
+    closed["premium_close"] = (matches["close_price"] * matches["matched"]).groupby(matches["open_order_id"]).sum() \
+        / closed["matched"]
+
+    trades = orders[orders["opening"] > 0].join(closed, how="left")
+    trades["matched"] = trades["matched"].fillna(0.0)
+    trades["close_cash"] = trades["close_cash"].fillna(0.0)
+    closed_fraction = trades["matched"] / trades["leg_contracts"]
+    is_closed = np.isclose(trades["matched"], trades["opening"])
+    is_expired = ~is_closed & (trades["expiration_date"] < as_of.tz_localize(None).normalize())
+    realized_fraction = np.where(is_expired, trades["opening"] / trades["leg_contracts"], closed_fraction)
+    open_cash = trades["cash"] * trades["contracts"]
+
+    trades = trades.assign(
+        opened_at=trades["created_at"],
+        premium_open=trades["price"],
+        closing_strategy=trades["last_closing_strategy"],
+        closed_contracts=closed_fraction * trades["contracts"],
+        profit=(open_cash * realized_fraction + trades["close_cash"]).round(2),
+        status=np.select([is_closed, is_expired], ["closed", "expired"], "open"),
+    )
+    return trades[TRADE_COLUMNS].reset_index(drop=True)
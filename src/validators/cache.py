@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from validators.validators import Validators
+
+VERDICTS_FILE_NAME = "verdicts.json"
+
+# how long a verdict is trusted. data files are re-checked every run since they change on download
+VERDICT_TTLS = {
+    Validators.ticker: timedelta(days=7),
+    Validators.option: timedelta(days=1),
+    Validators.data: None,
+    Validators.earnings: timedelta(hours=6),
+}
+
+
+class VerdictCache(object):
+    """
+    persisted validator verdicts: {validator type: {ticker: {"valid": bool, "checked_at": iso datetime}}}
+    """
+
+    def __init__(self, cache_dir, ttls=None):
+        self.file = os.path.join(cache_dir, VERDICTS_FILE_NAME)
+        self.ttls = ttls or VERDICT_TTLS
+        self.lock = threading.Lock()
+        self.verdicts = self.load()
+
+    def load(self) -> dict:
+        try:
+            with open(self.file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return dict()
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            tmp_file = f"{self.file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(self.verdicts, f, indent=1, sort_keys=True)
+            os.replace(tmp_file, self.file)
+
+    def get(self, validator_type: Validators, ticker: str, now=None) -> Optional[bool]:
+        """
+        the cached verdict, or None when there is none or it expired
+        """
+        ttl = self.ttls.get(validator_type)
+        if ttl is None:
+            return None
+        with self.lock:
+            verdict = self.verdicts.get(validator_type.name, dict()).get(ticker)
+        if verdict is None:
+            return None
+        now = now or datetime.now()
+        if now - datetime.fromisoformat(verdict["checked_at"]) >= ttl:
+            return None
+        return verdict["valid"]
+
+    def put(self, validator_type: Validators, ticker: str, valid: bool):
+        if self.ttls.get(validator_type) is None:
+            return
+        with self.lock:
+            self.verdicts.setdefault(validator_type.name, dict())[ticker] = {
+                "valid": valid,
+                "checked_at": datetime.now().isoformat(),
+            }
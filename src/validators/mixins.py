@@ -1,8 +1,13 @@
 from validators.validators import TickerValidator, DataValidator, \
-    OptionsValidator, EarningsValidator, Validators
+    OptionsValidator, EarningsValidator, Validators, \
+    InvalidTickerException, InvalidOptionException, InvalidDataException, InvalidEarningsException
+from validators.cache import VerdictCache
 from validators.validator import Validator
 from clients.client import ValidationClient
 
+INVALID_EXCEPTIONS = (InvalidTickerException, InvalidOptionException,
+                      InvalidDataException, InvalidEarningsException)
+
 
 class ValidatorFactory(object):
     def __init__(self, ticker: str, file: str, client: str) -> None:
@@ -24,11 +29,30 @@ class ValidatorFactory(object):
 class ValidatorMixin(object):
 
     @staticmethod
-    def validate(ticker: str, file: str, client: ValidationClient):
+    def validate(ticker: str, file: str, client: ValidationClient, verdicts: VerdictCache = None,
+                 validator_types=tuple(Validators)):
         factory = ValidatorFactory(ticker=ticker, file=file, client=client)
-        for validator_type in Validators:
+        for validator_type in validator_types:
             validator = factory.create(validator_type=validator_type)
+            if verdicts is None:
+                validator.validate()
+                continue
+            ValidatorMixin.validate_with_verdicts(validator, validator_type, ticker, verdicts)
+
+    @staticmethod
+    def validate_with_verdicts(validator: Validator, validator_type: Validators,
+                               ticker: str, verdicts: VerdictCache):
+        valid = verdicts.get(validator_type, ticker)
+        if valid is True:
+            return
+        if valid is False:
+            raise validator.invalid()
+        try:
             validator.validate()
+        except INVALID_EXCEPTIONS as e:
+            verdicts.put(validator_type, ticker, False)
+            raise e
+        verdicts.put(validator_type, ticker, True)
 
     @staticmethod
     def validate_ticker(ticker: str, client: ValidationClient):
@@ -38,6 +62,11 @@ class ValidatorMixin(object):
     def validate_data(file: str):
         DataValidator(file).validate()
 
+    @staticmethod
+    def valid_data_tickers(data_dir: str, max_workers: int = None, quarantine: bool = False) -> set:
+        valid_tickers, _ = DataValidator.scan(data_dir, max_workers=max_workers, quarantine=quarantine)
+        return valid_tickers
+
     @staticmethod
     def validate_options(ticker: str, client: ValidationClient):
         OptionsValidator(ticker, client).validate()
@@ -11,3 +11,7 @@ class Validator(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def validate(self):
         raise NotImplemented
+
+    @abc.abstractmethod
+    def invalid(self) -> Exception:
+        raise NotImplemented
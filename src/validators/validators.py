@@ -1,11 +1,21 @@
+import concurrent.futures
 import os
+import shutil
 from enum import Enum
+from typing import Optional
 
+from store import EarningsStore, EARNINGS_FILE_NAME, EARNINGS_HEADER_PREFIX
 from validators.validator import Validator
 from clients.client import ValidationClient
 from log.mixins import LoggingMixin
 
 
+# enough of the file to see an html doctype / tag or the csv header
+SNIFF_BYTES = 4096
+HTML_MARKERS = (b"<!", b"<html", b"<HTML")
+QUARANTINE_DIR_NAME = ".quarantine"
+
+
 class Validators(Enum):
     ticker = 0
     option = 1
@@ -29,7 +39,10 @@ class TickerValidator(Validator, LoggingMixin):
     def validate(self):
         does_exist = self.client.exists(self.ticker)
         if not does_exist:
-            raise InvalidTickerException(ticker=self.ticker)
+            raise self.invalid()
+
+    def invalid(self):
+        return InvalidTickerException(ticker=self.ticker)
 
 
 class InvalidOptionException(Exception):
@@ -49,7 +62,10 @@ class OptionsValidator(Validator, LoggingMixin):
 
     def validate(self):
         if not self.supports_options():
-            raise InvalidOptionException(self.ticker)
+            raise self.invalid()
+
+    def invalid(self):
+        return InvalidOptionException(self.ticker)
 
     def supports_options(self):
         return self.client.supports_options(self.ticker) is not None
@@ -69,28 +85,84 @@ class OptionsValidator(Validator, LoggingMixin):
 
 class InvalidDataException(Exception):
 
-    def __init__(self, file):
+    def __init__(self, file, reason="contains html"):
         self.file = file
-        self.message = f"Error: {self.file} contains html. A csv file was expected."
+        self.reason = reason
+        self.message = f"Error: {self.file} {self.reason}. A csv file was expected."
         super().__init__(self.message)
 
 
 class DataValidator(Validator, LoggingMixin):
+    """
+    sniffs the first SNIFF_BYTES of an earnings csv in process: it must exist,
+    must not be an html page and must start with the earnings header.
+    file is either the csv or its data/<ticker> directory.
+    """
 
     def __init__(self, file, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.file = file
+        self.reason = None
 
     def validate(self):
         if not self.is_valid_data():
-            raise InvalidDataException(self.file)
+            raise self.invalid()
+
+    def invalid(self):
+        return InvalidDataException(self.file, self.reason or "contains html")
 
     def is_valid_data(self):
-        return not self.does_contain_html()
+        self.reason = self.sniff(self.csv_file(self.file))
+        return self.reason is None
 
     def does_contain_html(self):
-        out = os.popen(f"grep -rHl '<!' {self.file}").read()
-        return out.strip() == self.file
+        return self.sniff(self.csv_file(self.file)) == "contains html"
+
+    @staticmethod
+    def csv_file(file):
+        if os.path.isdir(file):
+            return os.path.join(file, EARNINGS_FILE_NAME)
+        return file
+
+    @staticmethod
+    def sniff(csv_file) -> Optional[str]:
+        """
+        None when csv_file looks like an earnings csv, otherwise why it does not
+        """
+        try:
+            with open(csv_file, "rb") as f:
+                head = f.read(SNIFF_BYTES)
+        except FileNotFoundError:
+            return "does not exist"
+        except OSError:
+            return "could not be read"
+        if any(marker in head for marker in HTML_MARKERS):
+            return "contains html"
+        if not head.lstrip(b"\xef\xbb\xbf").startswith(EARNINGS_HEADER_PREFIX.encode()):
+            return "does not start with the earnings header"
+        return None
+
+    @classmethod
+    def scan(cls, data_dir, max_workers=None, quarantine=False) -> tuple[set, dict]:
+        """
+        sniffs every data/<ticker>/earnings.csv in parallel.
+        returns the valid tickers and {ticker: reason} for the invalid ones.
+        with quarantine, invalid files are moved to data/.quarantine/<ticker>/earnings.csv
+        """
+        files = EarningsStore(data_dir).list_csv_files()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            reasons = dict(zip(files.keys(), executor.map(cls.sniff, files.values())))
+        invalid = {ticker: reason for ticker, reason in reasons.items() if reason is not None}
+        if quarantine:
+            for ticker in invalid:
+                cls.quarantine(data_dir, ticker, files[ticker])
+        return set(reasons.keys()) - set(invalid.keys()), invalid
+
+    @staticmethod
+    def quarantine(data_dir, ticker, csv_file):
+        quarantine_dir = os.path.join(data_dir, QUARANTINE_DIR_NAME, ticker)
+        os.makedirs(quarantine_dir, exist_ok=True)
+        shutil.move(csv_file, os.path.join(quarantine_dir, os.path.basename(csv_file)))
 
 
 class InvalidEarningsException(Exception):
@@ -110,4 +182,7 @@ class EarningsValidator(Validator, LoggingMixin):
 
     def validate(self):
         if not self.client.has_future_earnings_dates(self.ticker):
-            raise InvalidEarningsException(ticker=self.ticker)
+            raise self.invalid()
+
+    def invalid(self):
+        return InvalidEarningsException(ticker=self.ticker)